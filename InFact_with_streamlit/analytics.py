@@ -0,0 +1,103 @@
+"""Pre-aggregated category x brand x harmful-status cube for the Analytics page.
+
+The cube is built once per dataset. Any category selection is answered by
+slicing the selected categories' cells and summing them, so the cost depends
+on the size of the cube, not on the number of products.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ("category", "brand", "harmful_status")
+MEASURES = ("count", "harmful_ingredients", "total_ingredients")
+
+
+def cube_cells(data):
+    """Measures summed per (category, brand, harmful status) cell of `data`."""
+    return (
+        data.assign(count=1)
+        .groupby(list(DIMENSIONS), observed=True, sort=True)
+        .agg(
+            count=("count", "sum"),
+            harmful_ingredients=("harmful_ingredient_count", "sum"),
+            total_ingredients=("total_ingredients", "sum"),
+        )
+        .reset_index()
+    )
+
+
+class AnalyticsCube:
+    def __init__(self, data=None, cells=None):
+        cube = cube_cells(data) if cells is None else cells
+        self.cells = cube
+        self.labels = {}
+        self.codes = {}
+        for dimension in DIMENSIONS:
+            values = cube[dimension].astype("category")
+            self.labels[dimension] = values.cat.categories
+            self.codes[dimension] = values.cat.codes.to_numpy()
+        self.measures = {measure: cube[measure].to_numpy(dtype=np.int64) for measure in MEASURES}
+        # Cells are sorted by category, so each category is one contiguous slice
+        cells = np.searchsorted(self.codes["category"], np.arange(len(self.labels["category"]) + 1))
+        self._slices = {
+            category: slice(lo, hi)
+            for category, lo, hi in zip(self.labels["category"], cells[:-1], cells[1:])
+        }
+        self.n_cells = len(cube)
+
+    def updated(self, added, removed):
+        """A new cube with the rows of `added` counted in and those of `removed`
+        counted out; only the two deltas are aggregated."""
+        removed = cube_cells(removed)
+        removed[list(MEASURES)] *= -1
+        # Plain labels, so cells from frames with different categories line up
+        parts = [part.astype({dimension: str for dimension in DIMENSIONS}) for part in (self.cells, cube_cells(added), removed)]
+        cells = (
+            pd.concat(parts, ignore_index=True)
+            .groupby(list(DIMENSIONS), sort=True)[list(MEASURES)]
+            .sum()
+            .reset_index()
+        )
+        return type(self)(cells=cells[cells["count"] > 0].reset_index(drop=True))
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.cells.astype({dimension: str for dimension in DIMENSIONS}).to_feather(os.path.join(directory, "cells.arrow"))
+
+    @classmethod
+    def load(cls, directory):
+        return cls(cells=pd.read_feather(os.path.join(directory, "cells.arrow")))
+
+    @property
+    def categories(self):
+        return list(self.labels["category"])
+
+    def _cells(self, categories):
+        if categories is None:
+            return np.arange(self.n_cells)
+        slices = [self._slices[c] for c in categories if c in self._slices]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(s.start, s.stop) for s in slices])
+
+    def totals(self, by, categories=None, measure="count"):
+        """`measure` summed per value of dimension `by`, largest first.
+
+        `categories` restricts the cube to those categories; None means all.
+        """
+        cells = self._cells(categories)
+        sums = np.bincount(
+            self.codes[by][cells],
+            weights=self.measures[measure][cells],
+            minlength=len(self.labels[by]),
+        ).astype(np.int64)
+        totals = pd.Series(sums, index=pd.Index(self.labels[by], name=by), name=measure)
+        totals = totals[totals > 0]
+        return totals.sort_values(ascending=False, kind="stable")
+
+    def summary(self, categories=None):
+        """Per-category count and ingredient sums for the selection."""
+        return pd.DataFrame({
+            measure: self.totals("category", categories, measure) for measure in MEASURES
+        }).fillna(0).astype(np.int64)
@@ -0,0 +1,135 @@
+"""Random-projection LSH index over the TF-IDF product vectors.
+
+The index is built offline, saved as plain .npy arrays and memory-mapped at
+startup. Each table hashes a product to the sign pattern of `n_bits` random
+projections; products whose vectors point the same way share buckets, so a
+query only reranks the products found in its buckets instead of every product
+sharing a term with it.
+
+    python ann_index.py build     # fit the similarity model and write the index
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+import config
+
+PROJECTION_CHUNK = 65536
+
+
+def default_bits(n_rows):
+    # Aim for a handful of products per bucket
+    return int(np.clip(np.round(np.log2(max(n_rows, 1) / 16)), 6, 32))
+
+
+def _bucket_keys(projections, n_tables, n_bits):
+    bits = (projections > 0).reshape(len(projections), n_tables, n_bits)
+    weights = np.left_shift(np.uint64(1), np.arange(n_bits, dtype=np.uint64))
+    return (bits.astype(np.uint64) * weights).sum(axis=2).astype(np.uint32)
+
+
+class LSHIndex:
+    def __init__(self, planes, keys, rows, n_bits, fingerprint=None):
+        self.planes = planes
+        # keys[t] holds the bucket keys of table t in sorted order, rows[t] the
+        # matching product ids
+        self.keys = keys
+        self.rows = rows
+        self.n_bits = n_bits
+        self.fingerprint = fingerprint
+
+    @property
+    def n_tables(self):
+        return self.keys.shape[0]
+
+    @classmethod
+    def build(cls, matrix, n_tables=16, n_bits=None, seed=0, fingerprint=None):
+        n_rows, n_features = matrix.shape
+        n_bits = n_bits or default_bits(n_rows)
+        rng = np.random.default_rng(seed)
+        planes = rng.standard_normal((n_features, n_tables * n_bits)).astype(np.float32)
+        keys = np.empty((n_tables, n_rows), dtype=np.uint32)
+        for start in range(0, n_rows, PROJECTION_CHUNK):
+            chunk = matrix[start:start + PROJECTION_CHUNK] @ planes
+            keys[:, start:start + len(chunk)] = _bucket_keys(chunk, n_tables, n_bits).T
+        rows = np.argsort(keys, axis=1, kind="stable").astype(np.int32)
+        keys = np.take_along_axis(keys, rows, axis=1)
+        return cls(planes, keys, rows, n_bits, fingerprint)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "planes.npy"), self.planes)
+        np.save(os.path.join(directory, "keys.npy"), self.keys)
+        np.save(os.path.join(directory, "rows.npy"), self.rows)
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"n_bits": self.n_bits, "fingerprint": self.fingerprint}, f)
+
+    @classmethod
+    def load(cls, directory, fingerprint=None):
+        """Memory-map a saved index; None if missing or built for other data."""
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if fingerprint is not None and meta.get("fingerprint") != fingerprint:
+            return None
+        arrays = [
+            np.load(os.path.join(directory, name), mmap_mode="r")
+            for name in ("planes.npy", "keys.npy", "rows.npy")
+        ]
+        return cls(*arrays, n_bits=meta["n_bits"], fingerprint=meta.get("fingerprint"))
+
+    def updated(self, remap, appended=None):
+        """A new in-memory index with row ids mapped through `remap` (-1 drops a
+        row) and the vectors in `appended` hashed with the same planes."""
+        n_kept = int((remap >= 0).sum())
+        rows = remap[self.rows]
+        keep = rows >= 0
+        # Every table drops the same rows, so the kept entries stay rectangular
+        keys = self.keys[keep].reshape(self.n_tables, n_kept)
+        rows = rows[keep].reshape(self.n_tables, n_kept).astype(np.int32)
+        if appended is not None and appended.shape[0]:
+            new_keys = _bucket_keys(np.asarray(appended @ self.planes), self.n_tables, self.n_bits).T
+            new_rows = np.broadcast_to(np.arange(n_kept, n_kept + appended.shape[0], dtype=np.int32), new_keys.shape)
+            keys = np.concatenate([keys, new_keys], axis=1)
+            rows = np.concatenate([rows, new_rows], axis=1)
+            order = np.argsort(keys, axis=1, kind="stable")
+            keys = np.take_along_axis(keys, order, axis=1)
+            rows = np.take_along_axis(rows, order, axis=1)
+        return type(self)(self.planes, keys, rows, self.n_bits)
+
+    def candidates(self, vector, n_tables=None):
+        """Product ids sharing a bucket with `vector` in the first `n_tables` tables."""
+        n_tables = min(n_tables or self.n_tables, self.n_tables)
+        projections = np.asarray(vector @ self.planes[:, :n_tables * self.n_bits])
+        query_keys = _bucket_keys(projections, n_tables, self.n_bits)[0]
+        found = []
+        for table, key in enumerate(query_keys):
+            keys = self.keys[table]
+            lo = np.searchsorted(keys, key, side="left")
+            hi = np.searchsorted(keys, key, side="right")
+            if hi > lo:
+                found.append(np.asarray(self.rows[table, lo:hi]))
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found)).astype(np.int64)
+
+
+def build_index(data_file=None, directory=None, n_tables=16, n_bits=None):
+    from datastore import read_catalogue
+    from similarity import SimilarityModel
+
+    model = SimilarityModel.from_frame(read_catalogue(data_file))
+    index = LSHIndex.build(model.matrix, n_tables=n_tables, n_bits=n_bits, fingerprint=model.fingerprint)
+    index.save(directory or config.ANN_DIR)
+    return index
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["build"]:
+        sys.exit(__doc__)
+    built = build_index()
+    print(f"Built {built.n_tables} tables x {built.n_bits} bits over {built.rows.shape[1]:,} products in {config.ANN_DIR}")
@@ -0,0 +1,240 @@
+"""JSON HTTP API over the catalogue query layer, without Streamlit.
+
+    python api.py [--host 127.0.0.1] [--port 8601]
+
+GET endpoints:
+    /search?q=&category=&harmful=&ingredient=&page=&page_size=
+    /products/<id>
+    /products/<id>/alternatives?limit=
+    /stats?category=<name>&category=<name>
+    /health
+    /metrics[?format=json]   stage timings (INFACT_METRICS=1), cache hit rates
+                             and memory, as Prometheus text by default
+
+Every response carries "version", an opaque id of the catalogue snapshot it
+was answered from; row ids are only valid under the same version.
+
+A search whose terms match nothing as typed is retried with typos corrected;
+its response then lists them as "corrections": {"brocoli": "broccoli"}.
+
+POST /batch with {"requests": [{"path": "/search", "params": {"q": "chips"}}, ...]}
+answers up to MAX_BATCH lookups in one round trip, all against the same
+snapshot, as {"responses": [{"status": 200, "body": {...}}, ...]} in order.
+Param values are strings, or lists of strings for repeated names.
+
+The server is a single asyncio event loop speaking HTTP/1.1 with keep-alive.
+Lookups are in-memory index hits, so they run inline on the loop. The
+catalogue comes from the same source the app uses (a private store, or the
+published snapshot with INFACT_SHARED=1), including live reloads.
+"""
+import argparse
+import asyncio
+import json
+import logging
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import config
+import metrics
+from filters import ALL
+
+MAX_BATCH = 100
+MAX_BODY = 1 << 20
+MAX_PAGE_SIZE = 100
+# Request timings are recorded per endpoint, not per URL
+STAGES = {"search", "products", "stats", "health", "metrics", "batch"}
+
+logger = logging.getLogger(__name__)
+
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _param(params, name, default=""):
+    values = params.get(name)
+    if values is None:
+        return default
+    if isinstance(values, (list, tuple)):
+        return values[-1] if values else default
+    return values
+
+
+def _int_param(params, name, default, low=1, high=None):
+    try:
+        value = int(_param(params, name, default))
+    except (TypeError, ValueError):
+        raise APIError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+    return max(low, value if high is None else min(value, high))
+
+
+def _check_params(params):
+    """Batch params in the shape parse_qs gives a query string."""
+    if not isinstance(params, dict) or not all(
+        isinstance(value, str) or (isinstance(value, list) and all(isinstance(item, str) for item in value))
+        for value in params.values()
+    ):
+        raise APIError(HTTPStatus.BAD_REQUEST, "params must map names to strings or lists of strings")
+    return params
+
+
+def route(queries, path, params):
+    """JSON body for one GET-style lookup; raises APIError."""
+    parts = [part for part in path.split("/") if part]
+    if parts == ["search"]:
+        return queries.search_page(
+            query=_param(params, "q"),
+            category=_param(params, "category", ALL),
+            harmful=_param(params, "harmful", ALL),
+            ingredient=_param(params, "ingredient"),
+            page=_int_param(params, "page", 1),
+            page_size=_int_param(params, "page_size", 10, high=MAX_PAGE_SIZE),
+        )
+    if parts == ["stats"]:
+        categories = params.get("category")
+        if isinstance(categories, str):
+            categories = [categories]
+        return queries.stats(categories or None)
+    if parts == ["health"]:
+        return {"status": "ok", "version": queries.version, "products": len(queries)}
+    if len(parts) in (2, 3) and parts[0] == "products":
+        try:
+            row_id = int(parts[1])
+            if len(parts) == 2:
+                return queries.product(row_id)
+            if parts[2] == "alternatives":
+                return queries.alternatives(row_id, limit=_int_param(params, "limit", 3, high=20))
+        except ValueError:
+            raise APIError(HTTPStatus.BAD_REQUEST, "product id must be an integer")
+        except KeyError:
+            raise APIError(HTTPStatus.NOT_FOUND, f"no product {parts[1]} in catalogue version {queries.version}")
+    raise APIError(HTTPStatus.NOT_FOUND, f"unknown endpoint {path}")
+
+
+def batch(queries, body):
+    try:
+        requests = json.loads(body)["requests"]
+    except (ValueError, KeyError, TypeError):
+        raise APIError(HTTPStatus.BAD_REQUEST, 'expected {"requests": [...]}')
+    if not isinstance(requests, list) or len(requests) > MAX_BATCH:
+        raise APIError(HTTPStatus.BAD_REQUEST, f"requests must be a list of at most {MAX_BATCH}")
+    responses = []
+    for request in requests:
+        try:
+            if not isinstance(request, dict):
+                raise APIError(HTTPStatus.BAD_REQUEST, "each request needs a path")
+            params = _check_params(request.get("params") or {})
+            result = route(queries, str(request.get("path", "")), params)
+            responses.append({"status": HTTPStatus.OK, "body": result})
+        except APIError as e:
+            responses.append({"status": e.status, "body": {"error": str(e)}})
+        except Exception:
+            # One failing lookup does not take the rest of the batch with it
+            logger.exception("Batch lookup %r failed", request)
+            responses.append({"status": HTTPStatus.INTERNAL_SERVER_ERROR, "body": {"error": "internal error"}})
+    return {"version": queries.version, "responses": responses}
+
+
+class APIServer:
+    def __init__(self, source):
+        # Anything with a .snapshot: CatalogueStore or SharedCatalogue
+        self.source = source
+        self.requests = 0
+
+    def metrics(self, params):
+        snapshot = self.source.snapshot
+        report = metrics.report(caches={"filter_pipeline": snapshot.filter_pipeline})
+        return report if _param(params, "format") == "json" else metrics.prometheus(report)
+
+    def respond(self, method, target, body):
+        """(status, body) for one HTTP request: a JSON-ready value, or text."""
+        url = urlsplit(target)
+        endpoint = url.path.strip("/").split("/")[0]
+        with metrics.timed("api_" + (endpoint if endpoint in STAGES else "other")):
+            try:
+                return self._respond(method, url, body)
+            except Exception:
+                # Answered, rather than dropping the connection mid-request
+                logger.exception("%s %s failed", method, target)
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal error"}
+
+    def _respond(self, method, url, body):
+        # One snapshot per request, so a batch never mixes catalogue versions
+        queries = self.source.snapshot.queries
+        try:
+            if method == "GET" and url.path.rstrip("/") == "/metrics":
+                return HTTPStatus.OK, self.metrics(parse_qs(url.query))
+            if method == "GET":
+                return HTTPStatus.OK, route(queries, url.path, parse_qs(url.query))
+            if method == "POST" and url.path.rstrip("/") == "/batch":
+                return HTTPStatus.OK, batch(queries, body)
+            raise APIError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} {url.path} is not supported")
+        except APIError as e:
+            return e.status, {"error": str(e)}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    status, payload = self.respond(method, target, body)
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+                self.requests += 1
+                if isinstance(payload, str):
+                    data, content_type = payload.encode(), "text/plain; version=0.0.4"
+                else:
+                    data, content_type = json.dumps(payload).encode(), "application/json"
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=config.API_HOST)
+    parser.add_argument("--port", type=int, default=config.API_PORT)
+    args = parser.parse_args()
+
+    from catalogue import open_catalogue
+
+    server = APIServer(open_catalogue())
+    print(f"Serving {len(server.source.snapshot.data):,} products on http://{args.host}:{args.port}")
+    asyncio.run(server.serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,16 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
 import pandas as pd
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from streamlit_lottie import st_lottie
-import requests
 import json
-import plotly.express as px
-import plotly.graph_objects as go
+import hmac
 import time
+import config
+import metrics
+from assets import AnimationCache
+from cards import cards_html, page_count, page_slice, product_links, risk_html
+from catalogue import open_catalogue
+from figures import CHART_TYPES
+from styles import get_css
 
 # Page configuration with custom theme
 st.set_page_config(
@@ -19,20 +20,21 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+run_started = time.perf_counter()
+
 # Initialize session state for theme
 if 'theme' not in st.session_state:
     st.session_state.theme = 'dark'
 
-# Load animations
-def load_lottieurl(url):
-    try:
-        r = requests.get(url)
-        if r.status_code != 200:
-            return None
-        return r.json()
-    except Exception as e:
-        st.warning(f"Failed to load animation: {e}")
-        return None
+# Opening the app with ?admin=<INFACT_ADMIN_TOKEN> shows the performance panel
+# (compared as bytes: compare_digest rejects non-ASCII str)
+is_admin = bool(config.ADMIN_TOKEN) and hmac.compare_digest(
+    st.query_params.get("admin", "").encode(), config.ADMIN_TOKEN.encode()
+)
+# Asked for from the panel: profile this whole run
+run_profile = None
+if is_admin and st.session_state.pop('profile_run', False):
+    run_profile = metrics.Profile(pyinstrument=st.session_state.get('use_pyinstrument', False)).start()
 
 # Add a default placeholder image URL - using a more reliable source
 PLACEHOLDER_IMAGE = "https://raw.githubusercontent.com/streamlit/streamlit/develop/examples/assets/streamlit-mark-color.png"
@@ -41,6 +43,9 @@ PLACEHOLDER_IMAGE = "https://raw.githubusercontent.com/streamlit/streamlit/devel
 def safe_lottie(animation_data, **kwargs):
     try:
         if animation_data is not None:
+            # Imported here: pages without an animation never load the component
+            from streamlit_lottie import st_lottie
+
             st_lottie(animation_data, **kwargs)
         else:
             # Fallback to placeholder image with error handling
@@ -69,217 +74,72 @@ def safe_lottie(animation_data, **kwargs):
         except:
             st.error("Failed to display visualization")
 
-# Update animations dictionary with working Lottie URLs
-animations = {
-    'food': load_lottieurl("https://lottie.host/c99f6338-a7aa-48c4-ad19-94f8f0c73a40/3DI4hKzM4k.json"),
-    'search': load_lottieurl("https://lottie.host/0912f275-b615-4ab9-91e6-e8ac187b5424/DPOCx7gsJu.json"),
-    'analytics': load_lottieurl("https://lottie.host/8a90f966-4c87-4fab-8dee-c486e2efa024/WPcIU2i71Y.json"),
-    'loading': load_lottieurl("https://lottie.host/91f2fcc4-7c92-4a5b-85e6-f4134b6691f9/8slKrm2rPN.json")
-}
-
-# Enhanced CSS with theme support and animations
-def get_css():
-    return f"""
-    <style>
-    /* Global Theme Variables */
-    :root {{
-        --bg-primary: {('#1a1a2e' if st.session_state.theme == 'dark' else '#ffffff')};
-        --bg-secondary: {('#16213e' if st.session_state.theme == 'dark' else '#f8f9fa')};
-        --text-primary: {('#e6e6e6' if st.session_state.theme == 'dark' else '#1a1a2e')};
-        --accent-color: #4CAF50;
-        --accent-hover: #45a049;
-    }}
-
-    /* Global Styles */
-    [data-testid="stAppViewContainer"] {{
-        background: linear-gradient(135deg, var(--bg-primary), var(--bg-secondary));
-        color: var(--text-primary);
-        transition: all 0.3s ease;
-    }}
-    
-    /* Modern Cards */
-    .modern-card {{
-        background: {('rgba(255, 255, 255, 0.05)' if st.session_state.theme == 'dark' else 'rgba(255, 255, 255, 0.9)')};
-        backdrop-filter: blur(10px);
-        border-radius: 20px;
-        padding: 2rem;
-        margin: 1rem 0;
-        border: 1px solid {('rgba(255, 255, 255, 0.1)' if st.session_state.theme == 'dark' else 'rgba(0, 0, 0, 0.1)')};
-        box-shadow: 0 8px 32px {('rgba(0, 0, 0, 0.1)' if st.session_state.theme == 'dark' else 'rgba(0, 0, 0, 0.05)')};
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-    }}
-    
-    .modern-card:hover {{
-        transform: translateY(-5px);
-        box-shadow: 0 12px 40px {('rgba(0, 0, 0, 0.2)' if st.session_state.theme == 'dark' else 'rgba(0, 0, 0, 0.1)')};
-    }}
-    
-    /* Buttons */
-    .stButton button {{
-        background: linear-gradient(45deg, var(--accent-color), var(--accent-hover));
-        color: white;
-        border-radius: 30px;
-        padding: 0.5rem 2rem;
-        border: none;
-        box-shadow: 0 4px 15px rgba(76, 175, 80, 0.3);
-        transition: all 0.3s ease;
-    }}
-    
-    .stButton button:hover {{
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(76, 175, 80, 0.4);
-    }}
-    
-    /* Search Box */
-    .stTextInput input {{
-        background: {('rgba(255, 255, 255, 0.05)' if st.session_state.theme == 'dark' else 'rgba(0, 0, 0, 0.05)')};
-        border: 2px solid rgba(76, 175, 80, 0.3);
-        border-radius: 15px;
-        color: var(--text-primary);
-        padding: 1rem;
-        transition: all 0.3s ease;
-    }}
-    
-    .stTextInput input:focus {{
-        border-color: var(--accent-color);
-        box-shadow: 0 0 15px rgba(76, 175, 80, 0.2);
-        transform: translateY(-2px);
-    }}
-    
-    /* Select Box */
-    .stSelectbox select {{
-        background: {('rgba(255, 255, 255, 0.05)' if st.session_state.theme == 'dark' else 'rgba(0, 0, 0, 0.05)')};
-        border-radius: 15px;
-        border: 2px solid rgba(76, 175, 80, 0.3);
-        color: var(--text-primary);
-        transition: all 0.3s ease;
-    }}
-    
-    /* Navigation */
-    .nav-link {{
-        background: {('rgba(255, 255, 255, 0.05)' if st.session_state.theme == 'dark' else 'rgba(0, 0, 0, 0.05)')} !important;
-        border-radius: 10px !important;
-        margin: 5px !important;
-        transition: all 0.3s ease !important;
-    }}
-    
-    .nav-link:hover {{
-        background: rgba(76, 175, 80, 0.1) !important;
-        transform: translateY(-2px) !important;
-    }}
-    
-    .nav-link.active {{
-        background: linear-gradient(45deg, var(--accent-color), var(--accent-hover)) !important;
-        color: white !important;
-    }}
-
-    /* Loading Animation */
-    @keyframes skeleton-loading {{
-        0% {{ background-position: 100% 50%; }}
-        100% {{ background-position: 0 50%; }}
-    }}
-
-    .skeleton {{
-        background: linear-gradient(90deg, 
-            {('rgba(255, 255, 255, 0.05)' if st.session_state.theme == 'dark' else 'rgba(0, 0, 0, 0.05)')} 25%, 
-            {('rgba(255, 255, 255, 0.1)' if st.session_state.theme == 'dark' else 'rgba(0, 0, 0, 0.1)')} 37%, 
-            {('rgba(255, 255, 255, 0.05)' if st.session_state.theme == 'dark' else 'rgba(0, 0, 0, 0.05)')} 63%);
-        background-size: 400% 100%;
-        animation: skeleton-loading 1.4s ease infinite;
-    }}
-
-    /* Toast Notifications */
-    .toast {{
-        position: fixed;
-        bottom: 20px;
-        right: 20px;
-        padding: 1rem 2rem;
-        border-radius: 10px;
-        background: var(--accent-color);
-        color: white;
-        box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2);
-        animation: slideIn 0.3s ease forwards;
-    }}
-
-    @keyframes slideIn {{
-        from {{ transform: translateX(100%); }}
-        to {{ transform: translateX(0); }}
-    }}
-
-    /* Theme Toggle */
-    .theme-toggle {{
-        position: fixed;
-        top: 20px;
-        right: 20px;
-        z-index: 1000;
-    }}
-
-    /* Responsive Design */
-    @media (max-width: 768px) {{
-        .modern-card {{
-            padding: 1rem;
-        }}
-        
-        .stButton button {{
-            width: 100%;
-        }}
-    }}
-
-    /* Header Styles */
-    .header {{
-        background: linear-gradient(45deg, var(--accent-color), var(--accent-hover));
-        color: white;
-        padding: 1rem 2rem;
-        border-radius: 15px;
-        margin-bottom: 2rem;
-    }}
-
-    .header h1 {{
-        margin: 0;
-        font-size: 2rem;
-    }}
-
-    .header p {{
-        margin: 0.5rem 0 0 0;
-        opacity: 0.9;
-    }}
-    </style>
-    """
+# Animations come from the local asset cache; missing ones are fetched in the
+# background and render as the placeholder until they arrive
+@st.cache_resource
+def load_animations():
+    return AnimationCache()
+
+animations = load_animations()
 
 # Inject CSS
-st.markdown(get_css(), unsafe_allow_html=True)
+st.markdown(get_css(st.session_state.theme), unsafe_allow_html=True)
+
+# Theme toggle: the callback runs before the rerun it triggers, so that one
+# run already renders the new theme
+def toggle_theme():
+    st.session_state.theme = 'light' if st.session_state.theme == 'dark' else 'dark'
 
-# Theme toggle
 with st.sidebar:
-    if st.button("🌓 Toggle Theme"):
-        st.session_state.theme = 'light' if st.session_state.theme == 'dark' else 'dark'
-        st.experimental_rerun()
-
-# Load and preprocess data
-@st.cache_data
-def load_data():
-    data = pd.read_csv('food_data_updated.csv')
-    data.columns = [col.strip().lower().replace(' ', '_') for col in data.columns]
-    if 'is_harmful?' not in data.columns:
-        data['is_harmful?'] = 'No'
-    data.fillna("N/A", inplace=True)
-    data['harmful_ingredient_count'] = pd.to_numeric(data.get('harmful_ingredient_count', 0), errors='coerce').fillna(0).astype(int)
-    data['total_ingredients'] = pd.to_numeric(data.get('total_ingredients', 0), errors='coerce').fillna(0).astype(int)
-    return data
-
-# Show loading animation
-with st.spinner("Loading data..."):
-    safe_lottie(animations['loading'], height=200, key="loading")
-    data = load_data()
-    time.sleep(1)  # Simulate loading for demo
+    st.button("🌓 Toggle Theme", on_click=toggle_theme)
+
+# Small per-session memo for results that are costly to render. Every widget
+# change reruns the script, so keys hold everything that shapes the result and
+# unrelated changes (theme, page menu, expanders) reuse what was built.
+def session_cached(name, key, compute, size=8):
+    cache = st.session_state.setdefault(name, {})
+    metrics.count(name, key in cache)
+    if key not in cache:
+        if len(cache) >= size:
+            cache.pop(next(iter(cache)))
+        cache[key] = compute()
+    return cache[key]
+
+# The catalogue and every structure derived from it (search index, similarity
+# model, ingredient table, scores, aggregates) live in one store per process.
+# It watches the data file and swaps in a delta-updated snapshot when it
+# changes, so new data needs no restart and never stalls a rerun. With
+# INFACT_SHARED=1 the process attaches to the snapshot published by
+# `python catalogue.py publish` instead, sharing its memory with other workers.
+@st.cache_resource(show_spinner="Loading product data...")
+def load_store():
+    return open_catalogue()
+
+# The cached loader shows its own spinner only when it actually runs; the
+# loading animation is limited to a session's first run and cleared afterwards.
+# One snapshot per rerun, so a reload mid-run cannot mix versions.
+if st.session_state.get('data_ready'):
+    snapshot = load_store().snapshot
+else:
+    loading = st.empty()
+    with loading.container():
+        safe_lottie(animations['loading'], height=200, key="loading")
+        snapshot = load_store().snapshot
+    loading.empty()
+    st.session_state.data_ready = True
+# All lookups go through the Streamlit-free query layer shared with api.py
+data, queries, figure_cache = snapshot.data, snapshot.queries, snapshot.figure_cache
 
 # Modern Navigation
+# ?page=<name> opens a page directly (used by deep links and benchmarks)
+PAGES = ["Home", "Search", "Analytics", "About"]
+start_page = st.query_params.get("page", "Home")
 selected = option_menu(
     menu_title=None,
-    options=["Home", "Search", "Analytics", "About"],
+    options=PAGES,
     icons=["house-heart-fill", "search-heart", "graph-up", "info-circle-fill"],
     menu_icon="cast",
-    default_index=0,
+    default_index=PAGES.index(start_page) if start_page in PAGES else 0,
     orientation="horizontal",
     styles={
         "container": {"padding": "0!important", "background-color": "transparent"},
@@ -324,10 +184,10 @@ if selected == "Home":
         with col_stat1:
             st.metric("Total Products", f"{len(data):,}", "Updated daily")
         with col_stat2:
-            harmful_count = len(data[data['is_harmful?'].str.lower() == 'yes'])
+            harmful_count = int(queries.harmful_counts().get('Yes', 0))
             st.metric("Harmful Products", f"{harmful_count:,}", f"{(harmful_count/len(data))*100:.1f}%")
         with col_stat3:
-            safe_count = len(data[data['is_harmful?'].str.lower() == 'no'])
+            safe_count = int(queries.harmful_counts().get('No', 0))
             st.metric("Safe Products", f"{safe_count:,}", f"{(safe_count/len(data))*100:.1f}%")
     
     with col2:
@@ -341,82 +201,94 @@ elif selected == "Search":
         </div>
     """, unsafe_allow_html=True)
     
-    # Enhanced search interface
-    col1, col2, col3 = st.columns([2, 1, 1])
-    with col1:
-        query = st.text_input("", placeholder="Search for a product...", help="Enter product name")
-    with col2:
-        category_filter = st.selectbox(
-            "Category",
-            options=["All"] + sorted(data["category"].dropna().unique().tolist())
-        )
-    with col3:
-        harmful_filter = st.radio(
-            "Show harmful?",
-            ["All", "Yes", "No"],
-            horizontal=True
-        )
+    # Enhanced search interface. The inputs form one submission (Enter or the
+    # Search button), so editing the query or flipping a filter does not rerun
+    # a search until the user is done.
+    with st.form("search"):
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            query = st.text_input("", placeholder="Search for a product...", help="Enter product name")
+        with col2:
+            category_filter = st.selectbox(
+                "Category",
+                options=["All"] + queries.categories
+            )
+        with col3:
+            harmful_filter = st.radio(
+                "Show harmful?",
+                ["All", "Yes", "No"],
+                horizontal=True
+            )
+        with st.expander("More filters"):
+            ingredient_filter = st.text_input(
+                "Contains ingredient",
+                placeholder="e.g. palm oil",
+                help="Only show products whose ingredient list contains this ingredient"
+            )
+        st.form_submit_button("Search")
 
-    # Filter data
-    filtered_data = data.copy()
-    if category_filter != "All":
-        filtered_data = filtered_data[filtered_data["category"] == category_filter]
-    if harmful_filter != "All":
-        filtered_data = filtered_data[filtered_data["is_harmful?"].str.lower() == harmful_filter.lower()]
+    # Too short to narrow anything down: wait for more characters
+    query = " ".join(query.split())
+    if 0 < len(query) < config.MIN_QUERY_LENGTH:
+        st.caption(f"Type at least {config.MIN_QUERY_LENGTH} characters to search.")
+        query = ""
 
     # Search functionality
-    if query:
+    if query or ingredient_filter:
         with st.spinner("Searching..."):
-            filtered_data = data.copy()
-            if category_filter != "All":
-                filtered_data = filtered_data[filtered_data['category'] == category_filter]
-            if harmful_filter != "All":
-                filtered_data = filtered_data[filtered_data['is_harmful?'].str.lower() == harmful_filter.lower()]
-            
-            # Improved search logic
-            mask = filtered_data['product_name'].str.contains(query, case=False, na=False)
-            search_results = filtered_data[mask]
-            
-            if not search_results.empty:
-                st.success(f"Found {len(search_results)} matching products")
-                
-                # Display top 5 matches
-                for _, result in search_results.head(5).iterrows():
-                    with st.container():
-                        st.markdown(f"""
-                            <div class="modern-card">
-                                <h3>{result['product_name']}</h3>
-                                <p><strong>Brand:</strong> {result['brand']}</p>
-                                <p><strong>Category:</strong> {result['category']}</p>
-                                <p><strong>Safety Status:</strong> 
-                                    <span style="color: {'#ef4444' if result['is_harmful?'].lower() == 'yes' else '#4CAF50'}">
-                                        {result['is_harmful?']}
-                                    </span>
-                                </p>
-                                <div class="neumorphic" style="margin-top: 1rem; padding: 1rem;">
-                                    <p><strong>Total Ingredients:</strong> {result['total_ingredients']}</p>
-                                    <p><strong>Harmful Ingredients:</strong> {result['harmful_ingredient_count']}</p>
-                                </div>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Show ingredient composition
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if result.get('nutritional_impact'):
-                                st.info(f"**Nutritional Impact:** {result['nutritional_impact']}")
-                        with col2:
-                            if result.get('healthy_alternatives'):
-                                st.success(f"**Healthy Alternative:** {result['healthy_alternatives']}")
+            search_key = (snapshot.id, query.lower(), category_filter, harmful_filter, " ".join(ingredient_filter.lower().split()))
+
+            def run_search():
+                with metrics.timed("search"):
+                    # Memoized filter + index lookup: only matching rows are touched, in rank order
+                    ids = queries.search(query, category_filter, harmful_filter, ingredient_filter)
+                    if not len(ids) and query:
+                        # Nothing matched as typed: retry with misspelt terms corrected
+                        return queries.fuzzy_search(query, category_filter, harmful_filter, ingredient_filter)
+                    return ids, {}
+
+            match_ids, corrections = session_cached("search_results", search_key, run_search)
+
+            if len(match_ids):
+                if corrections:
+                    fixed = ", ".join(f"'{typed}' → '{token}'" for typed, token in corrections.items())
+                    st.info(f"No exact matches for '{query}'. Showing results for {fixed}.")
+                st.success(f"Found {len(match_ids)} matching products")
+
+                # One page of matches, rendered as a single HTML block
+                page_col, info_col = st.columns([1, 3])
+                n_pages = page_count(len(match_ids))
+                with page_col:
+                    result_page = st.number_input(
+                        "Page", min_value=1, max_value=n_pages, value=1,
+                        key=f"result_page:{category_filter}:{harmful_filter}:{query}"
+                    )
+                rows = page_slice(len(match_ids), result_page)
+                with info_col:
+                    st.caption(f"Showing {rows.start + 1}-{rows.stop} of {len(match_ids)} (page {result_page} of {n_pages})")
+                page_ids = match_ids[rows]
+
+                def render_page():
+                    with metrics.timed("render_cards"):
+                        # Rules-based risk breakdown, real catalogue products with a similar
+                        # ingredient profile, and safer ones for products not already marked safe
+                        extras = [
+                            risk_html(*queries.risk(row_id))
+                            + product_links("Similar products", data.iloc[queries.similar(row_id)])
+                            + product_links("Safer picks from our catalogue", data.iloc[queries.safer(row_id)])
+                            for row_id in page_ids
+                        ]
+                        return cards_html(data.iloc[page_ids], extras)
+
+                st.markdown(session_cached("result_pages", (search_key, rows.start), render_page), unsafe_allow_html=True)
             else:
-                st.warning(f"No products found matching '{query}'. Try a different search term or adjust filters.")
+                searched = " containing ".join(f"'{term}'" for term in (query, ingredient_filter) if term)
+                st.warning(f"No products found matching {searched}. Try a different search term or adjust filters.")
                 # Show suggested searches
-                similar_products = filtered_data[
-                    filtered_data['product_name'].str.contains('|'.join(query.split()), case=False, na=False)
-                ]
-                if not similar_products.empty:
+                suggestions = data.iloc[queries.suggestions(query, category_filter, harmful_filter)]
+                if not suggestions.empty:
                     st.markdown("### You might be interested in:")
-                    for _, prod in similar_products.head(3).iterrows():
+                    for _, prod in suggestions.iterrows():
                         st.markdown(f"- {prod['product_name']} ({prod['brand']})")
 
 elif selected == "Analytics":
@@ -432,58 +304,25 @@ elif selected == "Analytics":
     with col1:
         selected_categories = st.multiselect(
             "Filter by Categories",
-            options=sorted(data["category"].unique()),
-            default=sorted(data["category"].unique())[:5]
+            options=queries.categories,
+            default=queries.categories[:5]
         )
     with col2:
         chart_type = st.selectbox(
             "Select Chart Type",
-            ["Bar", "Pie", "Line", "Scatter"]
+            CHART_TYPES
         )
     
-    # Filtered data
-    filtered_data = data[data['category'].isin(selected_categories)]
-    
     col1, col2 = st.columns(2)
+    theme = st.session_state.theme
     
     with col1:
         # Category Distribution
-        category_counts = filtered_data['category'].value_counts()
-        if chart_type == "Bar":
-            fig = px.bar(
-                x=category_counts.index,
-                y=category_counts.values,
-                title="Products by Category",
-                labels={'x': 'Category', 'y': 'Count'}
-            )
-        elif chart_type == "Pie":
-            fig = px.pie(
-                values=category_counts.values,
-                names=category_counts.index,
-                title="Category Distribution"
-            )
-        fig.update_layout(
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=('white' if st.session_state.theme == 'dark' else 'black'))
-        )
-        st.plotly_chart(fig)
+        st.plotly_chart(figure_cache.figure('category', selected_categories, theme, chart_type))
     
     with col2:
         # Harmful vs Non-harmful
-        harmful_counts = filtered_data['is_harmful?'].value_counts()
-        fig = px.pie(
-            values=harmful_counts.values,
-            names=harmful_counts.index,
-            title="Harmful vs Non-harmful Products",
-            hole=0.3
-        )
-        fig.update_layout(
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            font=dict(color=('white' if st.session_state.theme == 'dark' else 'black'))
-        )
-        st.plotly_chart(fig)
+        st.plotly_chart(figure_cache.figure('harmful', selected_categories, theme))
     
     # Brand Analysis
     st.markdown("""
@@ -492,19 +331,7 @@ elif selected == "Analytics":
         </div>
     """, unsafe_allow_html=True)
     
-    top_brands = filtered_data['brand'].value_counts().head(10)
-    fig = px.bar(
-        x=top_brands.index,
-        y=top_brands.values,
-        title="Top 10 Brands by Product Count",
-        labels={'x': 'Brand', 'y': 'Number of Products'}
-    )
-    fig.update_layout(
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        font=dict(color=('white' if st.session_state.theme == 'dark' else 'black'))
-    )
-    st.plotly_chart(fig)
+    st.plotly_chart(figure_cache.figure('brands', selected_categories, theme))
 
 elif selected == "About":
     col1, col2 = st.columns([2, 1])
@@ -553,4 +380,51 @@ st.markdown("""
         <p style="color: rgba(255,255,255,0.6);">Made with ❤️ by Team InFact</p>
         <p style="color: rgba(255,255,255,0.4);">© 2025 All rights reserved | PDEA COEM Pune</p>
     </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+if run_profile is not None:
+    st.session_state.profile_text = run_profile.stop()
+if metrics.TIMINGS.enabled:
+    metrics.TIMINGS.record("rerun", time.perf_counter() - run_started)
+
+# Admin-only performance panel: where rerun time goes, how well the caches
+# work and how much memory the process holds
+if is_admin:
+    def request_profile():
+        st.session_state.profile_run = True
+
+    with st.sidebar.expander("⏱️ Performance"):
+        if not metrics.TIMINGS.enabled:
+            st.caption("Stage timings are off: start the app with INFACT_METRICS=1.")
+        report = metrics.report(
+            caches={
+                "filter_pipeline": snapshot.filter_pipeline,
+                "figure_cache": figure_cache,
+                "theme_css": get_css.cache_info(),
+            },
+            sizes={
+                "catalogue": session_cached(
+                    "catalogue_bytes", snapshot.id,
+                    lambda: int(data.memory_usage(deep=True).sum()), size=1
+                ),
+            },
+        )
+        if report["stages"]:
+            st.markdown("**Stages** (ms)")
+            st.dataframe(pd.DataFrame([
+                {"stage": stage, "runs": stats["count"],
+                 "p50": stats["p50"] * 1000, "p95": stats["p95"] * 1000, "max": stats["max"] * 1000}
+                for stage, stats in report["stages"].items()
+            ]).set_index("stage").round(2))
+        st.markdown("**Caches**")
+        st.dataframe(pd.DataFrame.from_dict(report["caches"], orient="index").round(3))
+        st.markdown("**Memory**")
+        for kind, size in report["memory"].items():
+            st.caption(f"{kind}: {size / 2 ** 20:,.1f} MB")
+        col1, col2 = st.columns(2)
+        col1.download_button("JSON", json.dumps(report, indent=2), "infact-metrics.json", "application/json")
+        col2.download_button("Prometheus", metrics.prometheus(report), "infact-metrics.prom", "text/plain")
+        st.checkbox("Use pyinstrument if installed", key="use_pyinstrument")
+        st.button("Profile a rerun", on_click=request_profile)
+        if st.session_state.get("profile_text"):
+            st.code(st.session_state.profile_text, language=None)
\ No newline at end of file
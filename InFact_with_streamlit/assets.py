@@ -0,0 +1,154 @@
+"""Local cache and background prefetch for the Lottie animations.
+
+Each animation is read from disk when it is first asked for: first the
+bundled `assets/lottie` directory, then the writable cache directory. Files are named after a hash of their
+content and a small manifest maps each source URL to its file. Anything
+missing is fetched in the background with strict timeouts, so a page render
+never waits on the network; until a fetch lands, callers get None and show
+the placeholder instead. A page only loads the animations it shows.
+
+    python assets.py fetch     # download all animations into assets/lottie
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import metrics
+
+LOTTIE_URLS = {
+    'food': "https://lottie.host/c99f6338-a7aa-48c4-ad19-94f8f0c73a40/3DI4hKzM4k.json",
+    'search': "https://lottie.host/0912f275-b615-4ab9-91e6-e8ac187b5424/DPOCx7gsJu.json",
+    'analytics': "https://lottie.host/8a90f966-4c87-4fab-8dee-c486e2efa024/WPcIU2i71Y.json",
+    'loading': "https://lottie.host/91f2fcc4-7c92-4a5b-85e6-f4134b6691f9/8slKrm2rPN.json",
+}
+
+MANIFEST = "manifest.json"
+
+logger = logging.getLogger(__name__)
+
+# Serialises manifest read-modify-write between fetch threads
+_manifest_lock = threading.Lock()
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _read_asset(directory, url):
+    filename = _read_manifest(directory).get(url)
+    if not filename:
+        return None
+    try:
+        with open(os.path.join(directory, filename)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, payload):
+    partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(partial, "wb") as f:
+        f.write(payload)
+    os.replace(partial, path)
+
+
+def fetch_asset(url, directory, timeout):
+    """Download one animation into `directory` under a content-hash name."""
+    import requests
+
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    animation = response.json()
+    payload = json.dumps(animation, separators=(",", ":")).encode()
+    filename = f"{hashlib.sha256(payload).hexdigest()[:16]}.json"
+    os.makedirs(directory, exist_ok=True)
+    _write_atomic(os.path.join(directory, filename), payload)
+    with _manifest_lock:
+        manifest = _read_manifest(directory)
+        manifest[url] = filename
+        _write_atomic(os.path.join(directory, MANIFEST), json.dumps(manifest, indent=2).encode())
+    return animation
+
+
+class AnimationCache:
+    def __init__(self, urls=LOTTIE_URLS, directories=None, timeout=None, retry_after=None):
+        self.urls = dict(urls)
+        self.directories = directories or [config.ASSET_DIR, config.LOTTIE_CACHE_DIR]
+        self.timeout = config.LOTTIE_TIMEOUT if timeout is None else timeout
+        self.retry_after = config.LOTTIE_RETRY_AFTER if retry_after is None else retry_after
+        self._animations = {}
+        self._lock = threading.Lock()
+        self._fetching = set()
+        self._last_attempt = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.urls), 1), thread_name_prefix="lottie")
+
+    def _read_local(self, name):
+        for directory in self.directories:
+            animation = _read_asset(directory, self.urls[name])
+            if animation is not None:
+                with self._lock:
+                    self._animations[name] = animation
+                return animation
+        return None
+
+    def prefetch(self, names=None):
+        """Load the named animations (default: all) from disk, and start
+        background fetches for those not there yet."""
+        now = time.monotonic()
+        names = [
+            name for name in (self.urls if names is None else names)
+            if name not in self._animations and self._read_local(name) is None
+        ]
+        with self._lock:
+            missing = [
+                name for name in names
+                if name not in self._fetching
+                and now - self._last_attempt.get(name, -self.retry_after) >= self.retry_after
+            ]
+            for name in missing:
+                self._fetching.add(name)
+                self._last_attempt[name] = now
+        for name in missing:
+            self._executor.submit(self._fetch, name)
+
+    def _fetch(self, name):
+        import requests
+
+        try:
+            with metrics.timed("lottie_fetch"):
+                animation = fetch_asset(self.urls[name], self.directories[-1], self.timeout)
+        except (requests.RequestException, OSError, ValueError) as e:
+            logger.warning("Failed to load animation %r: %s", name, e)
+            animation = None
+        with self._lock:
+            self._fetching.discard(name)
+            if animation is not None:
+                self._animations[name] = animation
+
+    def get(self, name):
+        """The animation if it is available locally, otherwise None (never blocks)."""
+        animation = self._animations.get(name)
+        if animation is None:
+            self.prefetch([name])
+            animation = self._animations.get(name)
+        return animation
+
+    __getitem__ = get
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["fetch"]:
+        sys.exit(__doc__)
+    for name, url in LOTTIE_URLS.items():
+        fetch_asset(url, config.ASSET_DIR, config.LOTTIE_TIMEOUT)
+        print(f"Fetched {name}")
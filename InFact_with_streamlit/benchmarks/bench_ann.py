@@ -0,0 +1,79 @@
+"""Recall/latency of the LSH similarity index against exact sparse search.
+
+    python benchmarks/bench_ann.py [--queries 500] [--k 5] [--data path.csv]
+
+For every table count the LSH index is probed with, reports recall@k against
+the exact top-k and the per-query latency, so INFACT_ANN_TABLES can be picked
+from the printed table. Many products tie on score (same ingredient text), so
+recall counts the approximate hits scoring at least the exact k-th score, not
+the exact top-k's row ids, which are an arbitrary pick among the ties.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_index import LSHIndex  # noqa: E402
+from datastore import read_catalogue  # noqa: E402
+from similarity import SimilarityModel  # noqa: E402
+
+
+def timed_queries(model, rows, k):
+    results, timings = [], []
+    for row_id in rows:
+        start = time.perf_counter()
+        _, values = model.top_k(row_id, k=k)
+        timings.append(time.perf_counter() - start)
+        results.append(values)
+    return results, np.asarray(timings) * 1000
+
+
+def recall(approx, exact):
+    """Share of the exact top-k's slots filled by hits as close as its k-th."""
+    hits = 0
+    for found, best in zip(approx, exact):
+        if len(best):
+            # Both paths compute the same cosines, up to float32 rounding
+            hits += min(int(np.count_nonzero(found >= best[-1] * (1 - 1e-5))), len(best))
+    return hits / max(sum(len(best) for best in exact), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=None)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--tables", type=int, default=16)
+    parser.add_argument("--bits", type=int, default=None)
+    args = parser.parse_args()
+
+    data = read_catalogue(args.data)
+    model = SimilarityModel.from_frame(data)
+    start = time.perf_counter()
+    index = LSHIndex.build(model.matrix, n_tables=args.tables, n_bits=args.bits)
+    print(f"{len(data):,} products, {index.n_tables} tables x {index.n_bits} bits, "
+          f"built in {time.perf_counter() - start:.2f}s")
+
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(data), size=min(args.queries, len(data)), replace=False)
+
+    model.ann = None
+    exact, exact_ms = timed_queries(model, rows, args.k)
+    print(f"{'tables':>6} {'recall@' + str(args.k):>9} {'mean ms':>8} {'p95 ms':>8}")
+    print(f"{'exact':>6} {1.0:>9.3f} {exact_ms.mean():>8.3f} {np.percentile(exact_ms, 95):>8.3f}")
+
+    model.ann = index
+    n_tables = 1
+    while n_tables <= index.n_tables:
+        model.ann_tables = n_tables
+        approx, approx_ms = timed_queries(model, rows, args.k)
+        print(f"{n_tables:>6} {recall(approx, exact):>9.3f} {approx_ms.mean():>8.3f} {np.percentile(approx_ms, 95):>8.3f}")
+        n_tables *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Requests per second of the JSON API (api.py) served on one core.
+
+    python benchmarks/bench_api.py [--duration 5] [--clients 4] [--batch 10] [--json out.json]
+
+Starts api.py in a subprocess pinned to a single CPU, then for each scenario
+has `--clients` processes send requests over keep-alive connections for
+`--duration` seconds. "batch" posts `--batch` mixed lookups per request, so
+its lookups/s shows what batching saves over one lookup per round trip. On a
+single-core host the clients compete with the server, which understates it.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUERIES = ["chips", "peanut butter", "chocolate", "palm oil", "organic", "soda", "cheese", "bar"]
+
+
+def scenario_requests(name, batch, n_products):
+    """Endless (method, path, body) requests of one scenario."""
+    i = 0
+    while True:
+        i += 1
+        query = QUERIES[i % len(QUERIES)]
+        row_id = (i * 7919) % n_products
+        lookups = [
+            ("/search", {"q": query}),
+            ("/products/%d" % row_id, {}),
+            ("/products/%d/alternatives" % row_id, {}),
+            ("/stats", {}),
+        ]
+        if name == "batch":
+            requests = [{"path": path, "params": params} for path, params in (lookups * batch)[:batch]]
+            yield "POST", "/batch", json.dumps({"requests": requests})
+            continue
+        path, params = lookups[["search", "product", "alternatives", "stats"].index(name)]
+        yield "GET", path + ("?" + urlencode(params) if params else ""), None
+
+
+def client(args):
+    port, name, batch, n_products, duration = args
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    done = 0
+    deadline = time.perf_counter() + duration
+    for method, path, body in scenario_requests(name, batch, n_products):
+        if time.perf_counter() >= deadline:
+            break
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{method} {path}: HTTP {response.status}")
+        done += 1
+    connection.close()
+    return done
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def pin_to_one_cpu():
+    os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+
+def start_server(port):
+    server = subprocess.Popen(
+        [sys.executable, "api.py", "--port", str(port)],
+        cwd=APP_DIR, stdout=subprocess.DEVNULL,
+        preexec_fn=pin_to_one_cpu if hasattr(os, "sched_setaffinity") else None,
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            return server, json.loads(connection.getresponse().read())["products"]
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("api.py did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    port = free_port()
+    server, n_products = start_server(port)
+    results = {}
+    try:
+        with multiprocessing.Pool(args.clients) as pool:
+            for name in ["search", "product", "alternatives", "stats", "batch"]:
+                jobs = [(port, name, args.batch, n_products, args.duration)] * args.clients
+                requests = sum(pool.map(client, jobs))
+                lookups = requests * (args.batch if name == "batch" else 1)
+                results[name] = {
+                    "requests_per_s": round(requests / args.duration, 1),
+                    "lookups_per_s": round(lookups / args.duration, 1),
+                }
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{'scenario':<14} {'req/s':>9} {'lookups/s':>10}   ({args.clients} clients, {n_products:,} products)")
+    for name, result in results.items():
+        print(f"{name:<14} {result['requests_per_s']:>9.0f} {result['lookups_per_s']:>10.0f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
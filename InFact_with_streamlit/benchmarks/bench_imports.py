@@ -0,0 +1,115 @@
+"""Startup import time of the app, measured with python -X importtime.
+
+    python benchmarks/bench_imports.py [--budget-ms 900] [--runs 5] [--json]
+
+Each run starts a fresh interpreter that imports Streamlit and the option
+menu, which any page of any Streamlit app pays for, and then every module
+app.py imports at the top level (read from app.py itself). Whatever is
+imported after the framework is the app's startup cost; its median over the
+runs must stay within the budget. Modules in DEFERRED serve a single page or
+a single feature and are imported where they are used, so the run also fails
+when the app's top-level imports pull any of them in.
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRAMEWORK = ("streamlit", "streamlit_option_menu")
+DEFERRED = ("sklearn", "plotly.express", "plotly.graph_objects", "streamlit_lottie", "requests")
+BUDGET_MS = 900
+
+
+def app_imports(path=os.path.join(APP_DIR, "app.py")):
+    """Modules app.py imports at the top level, in order."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names = [node.module]
+        else:
+            continue
+        modules += [name for name in names if name not in modules and name.split(".")[0] not in FRAMEWORK]
+    return modules
+
+
+def importtime(modules):
+    """[(module, self us, cumulative us, depth)] of one fresh interpreter,
+    in the order -X importtime reports them (a package after its imports)."""
+    code = f"import {', '.join(FRAMEWORK)}\n" + "".join(f"import {module}\n" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=APP_DIR, capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue  # the header
+        # Names are indented two spaces per level below the first
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), int(own), int(cumulative), depth))
+    return entries
+
+
+def app_share(entries):
+    """(top-level {module: cumulative ms}, every module) imported after the framework."""
+    after = max(i for i, (name, _, _, depth) in enumerate(entries) if depth == 0 and name in FRAMEWORK) + 1
+    top = {name: cumulative / 1000 for name, _, cumulative, depth in entries[after:] if depth == 0}
+    return top, {name for name, _, _, _ in entries[after:]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="allowed median import time of the app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print the measurements as JSON")
+    args = parser.parse_args()
+
+    modules = app_imports()
+    totals, framework, runs = [], [], []
+    for _ in range(args.runs):
+        entries = importtime(modules)
+        top, imported = app_share(entries)
+        totals.append(sum(top.values()))
+        framework.append(sum(cumulative for name, _, cumulative, depth in entries if depth == 0 and name in FRAMEWORK) / 1000)
+        runs.append(top)
+    median = statistics.median(totals)
+    # Modules the app imported as a side effect of what it needs, not by name
+    deferred = sorted(name for name in imported if name in DEFERRED)
+    result = {
+        "app_ms": round(median, 1),
+        "framework_ms": round(statistics.median(framework), 1),
+        "budget_ms": args.budget_ms,
+        "modules_ms": {name: round(statistics.median(run.get(name, 0.0) for run in runs), 1) for name in runs[-1]},
+        "deferred_imported": deferred,
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Framework (streamlit, option menu): {result['framework_ms']:.0f} ms")
+        print(f"App imports: {median:.0f} ms (median of {args.runs}, budget {args.budget_ms:.0f} ms)")
+        for name, ms in sorted(result["modules_ms"].items(), key=lambda item: -item[1]):
+            print(f"  {name:<20} {ms:8.1f} ms")
+    failed = False
+    if median > args.budget_ms:
+        print(f"FAIL: app imports take {median:.0f} ms, over the {args.budget_ms:.0f} ms budget", file=sys.stderr)
+        failed = True
+    if deferred:
+        print(f"FAIL: imported at startup, should be deferred: {', '.join(deferred)}", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
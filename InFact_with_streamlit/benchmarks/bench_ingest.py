@@ -0,0 +1,85 @@
+"""Peak memory and throughput of catalogue ingestion, by catalogue size.
+
+    python benchmarks/bench_ingest.py [--sizes 100k,1M] [--chunk-rows 50000] [--tolerance 25] [--whole]
+
+Each size is a synthetic catalogue (synth_catalogue.py) ingested into a
+fresh cache file by a fresh interpreter, which reports its peak RSS, so runs
+do not share allocator state. Streamed ingestion should take the same memory
+at every size: the run fails when the largest catalogue's peak RSS exceeds
+the smallest's by more than --tolerance percent, so the smallest should span
+a few chunks. --whole also times the whole-file path (read_catalogue then
+write_cache) for comparison; its peak grows with the file.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import config  # noqa: E402
+from synth_catalogue import parse_size, synthetic_catalogue  # noqa: E402
+
+DATA_DIR = os.path.join(config.CACHE_DIR, "bench")
+
+RUN = """
+import json, sys, time
+import metrics
+from datastore import ingest, read_catalogue, write_cache
+path, target, mode, chunk_rows = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+started = time.perf_counter()
+if mode == "stream":
+    rows = ingest(path, target, chunk_rows)
+else:
+    data = read_catalogue(path)
+    write_cache(data, target)
+    rows = len(data)
+print(json.dumps(dict(rows=rows, seconds=time.perf_counter() - started, **metrics.memory())))
+"""
+
+
+def measure(path, mode, chunk_rows):
+    with tempfile.TemporaryDirectory() as directory:
+        result = subprocess.run(
+            [sys.executable, "-c", RUN, path, os.path.join(directory, "catalogue.arrow"), mode, str(chunk_rows)],
+            cwd=APP_DIR, capture_output=True, text=True, check=True,
+        )
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100k,1M", help="comma-separated sizes, e.g. 100k,1M,10M")
+    parser.add_argument("--chunk-rows", type=int, default=config.INGEST_CHUNK_ROWS)
+    parser.add_argument("--tolerance", type=int, default=25, help="allowed peak RSS growth, in percent")
+    parser.add_argument("--whole", action="store_true", help="also measure whole-file ingestion")
+    args = parser.parse_args()
+
+    modes = ["stream", "whole"] if args.whole else ["stream"]
+    print(f"{'size':>10} {'mode':>7} {'seconds':>9} {'rows/s':>10} {'peak RSS':>10}")
+    peaks = []
+    for size in args.sizes.split(","):
+        path = synthetic_catalogue(parse_size(size), DATA_DIR)
+        for mode in modes:
+            result = measure(path, mode, args.chunk_rows)
+            if mode == "stream":
+                peaks.append(result["peak_rss"])
+            print(
+                f"{result['rows']:>10,} {mode:>7} {result['seconds']:>9.2f} "
+                f"{result['rows'] / result['seconds']:>10,.0f} {result['peak_rss'] / 2**20:>8.0f}MB"
+            )
+    growth = 100 * (peaks[-1] / peaks[0] - 1)
+    print(f"Streamed peak RSS grows {growth:.0f}% from the smallest to the largest size")
+    if growth > args.tolerance:
+        print(f"FAIL: over the {args.tolerance}% tolerance", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""Load, search, filter, analytics and similarity at catalogue scale (pytest-benchmark).
+
+    python benchmarks/bench_scale.py [--scales 10k,100k,1M] [--tolerance 25] [--save baseline]
+
+Catalogues of each size come from synth_catalogue.py and are generated once
+into CACHE_DIR/bench. Every run is compared with the latest run saved under
+benchmarks/baselines/ for this machine, and fails when any benchmark's median
+is more than --tolerance percent slower. After an intended change, or on a
+new machine, record a baseline with --save baseline. 10k and 100k run by
+default; 1M and 10M take minutes and several GB, so they are opt-in. Any other
+arguments go to pytest, e.g. -k search.
+
+Running pytest on this file directly works too, with INFACT_BENCH_SCALES
+selecting the sizes.
+"""
+import argparse
+import glob
+import os
+import sys
+from functools import cached_property
+
+import numpy as np
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import config  # noqa: E402
+from analytics import AnalyticsCube  # noqa: E402
+from datastore import read_cache, read_catalogue, write_cache  # noqa: E402
+from filters import ALL, FilterPipeline  # noqa: E402
+from ingredients import IngredientTable  # noqa: E402
+from search_index import SearchIndex  # noqa: E402
+from similarity import SimilarityModel  # noqa: E402
+from synth_catalogue import parse_size, synthetic_catalogue  # noqa: E402
+
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+DATA_DIR = os.path.join(config.CACHE_DIR, "bench")
+SCALES = os.environ.get("INFACT_BENCH_SCALES", "10k,100k").split(",")
+
+QUERIES = ["chocolate", "peanut butter", "organic milk", "chips", "sugar free", "zero", "choc", "gluten free bread"]
+TYPOS = ["choclate", "peanutt buter", "organik", "brocoli"]
+FILTERS = [
+    (ALL, "Yes", "", ""),
+    ("Chocolate", ALL, "", ""),
+    (ALL, "No", "chocolate", ""),
+    (ALL, ALL, "", "palm oil"),
+    (ALL, "Yes", "chips", "salt"),
+]
+
+
+class Catalogue:
+    """A synthetic catalogue and the structures built from it, built on first use."""
+
+    def __init__(self, size):
+        self.n_rows = parse_size(size)
+        self.csv = synthetic_catalogue(self.n_rows, DATA_DIR)
+
+    @cached_property
+    def data(self):
+        return read_catalogue(self.csv)
+
+    @cached_property
+    def arrow(self):
+        target = self.csv[:-len(".csv")] + ".arrow"
+        if not os.path.exists(target):
+            write_cache(self.data, target)
+        return target
+
+    @cached_property
+    def search_index(self):
+        return SearchIndex.from_frame(self.data)
+
+    @cached_property
+    def ingredient_table(self):
+        return IngredientTable.from_frame(self.data)
+
+    @cached_property
+    def similarity(self):
+        return SimilarityModel.from_frame(self.data)
+
+    @cached_property
+    def cube(self):
+        return AnalyticsCube(self.data)
+
+    def sample_rows(self, n=20):
+        return np.random.default_rng(0).integers(0, len(self.data), size=n)
+
+
+def rounds(catalogue, small=5):
+    # Whole-catalogue passes take seconds to minutes at 1M rows and above
+    return small if catalogue.n_rows <= 100_000 else 1
+
+
+@pytest.fixture(scope="module", params=SCALES)
+def catalogue(request):
+    return Catalogue(request.param)
+
+
+def test_load_csv(benchmark, catalogue):
+    data = benchmark.pedantic(read_catalogue, args=(catalogue.csv,), rounds=rounds(catalogue, 3))
+    assert len(data) == catalogue.n_rows
+
+
+def test_load_arrow_cache(benchmark, catalogue):
+    data = benchmark.pedantic(read_cache, args=(catalogue.arrow,), rounds=rounds(catalogue))
+    assert len(data) == catalogue.n_rows
+
+
+def test_build_search_index(benchmark, catalogue):
+    benchmark.pedantic(SearchIndex.from_frame, args=(catalogue.data,), rounds=rounds(catalogue, 3))
+
+
+def test_search(benchmark, catalogue):
+    index = catalogue.search_index
+    results = benchmark(lambda: [index.search(query) for query in QUERIES])
+    assert all(len(ids) for ids in results)
+
+
+def test_fuzzy_search(benchmark, catalogue):
+    index = catalogue.search_index
+    results = benchmark(lambda: [index.fuzzy_search(query) for query in TYPOS])
+    assert all(corrections for _, corrections in results)
+
+
+def test_filter(benchmark, catalogue):
+    # No memo, so every round computes each combination
+    pipeline = FilterPipeline(catalogue.data, catalogue.search_index, catalogue.ingredient_table, cache_size=0)
+    benchmark(lambda: [pipeline.rows(*combination) for combination in FILTERS])
+
+
+def test_analytics_build(benchmark, catalogue):
+    benchmark.pedantic(AnalyticsCube, args=(catalogue.data,), rounds=rounds(catalogue))
+
+
+def test_analytics_totals(benchmark, catalogue):
+    cube = catalogue.cube
+    categories = cube.categories[:5]
+
+    def totals():
+        return [
+            cube.totals("category"),
+            cube.totals("harmful_status", categories),
+            cube.totals("brand", categories).head(10),
+        ]
+
+    benchmark(totals)
+
+
+def test_similarity(benchmark, catalogue):
+    model = catalogue.similarity
+    rows = catalogue.sample_rows()
+    results = benchmark(lambda: [model.top_k(row_id, k=5) for row_id in rows])
+    # A product without ingredient text has no neighbours
+    assert any(len(ids) for ids, _ in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default=",".join(SCALES), help="comma-separated sizes, e.g. 10k,100k,1M,10M")
+    parser.add_argument("--tolerance", type=int, default=25, help="allowed median slowdown, in percent")
+    parser.add_argument("--save", metavar="NAME", help="save this run as the new baseline")
+    args, pytest_args = parser.parse_known_args()
+
+    os.environ["INFACT_BENCH_SCALES"] = args.scales
+    options = [
+        __file__, "-p", "no:cacheprovider",
+        f"--benchmark-storage=file://{BASELINE_DIR}",
+        "--benchmark-sort=fullname",
+        "--benchmark-columns=min,median,max,rounds",
+    ]
+    from pytest_benchmark.utils import get_machine_id
+
+    # Saved runs are filed per platform and Python version
+    if args.save:
+        options.append(f"--benchmark-save={args.save}")
+    elif glob.glob(os.path.join(BASELINE_DIR, get_machine_id(), "*.json")):
+        options += ["--benchmark-compare", f"--benchmark-compare-fail=median:{args.tolerance}%"]
+    else:
+        print(f"No baseline for {get_machine_id()} in {BASELINE_DIR}; record one with --save baseline")
+    return pytest.main(options + pytest_args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Time-to-first-render and warm-rerun latency per page, via Streamlit's AppTest.
+
+    python benchmarks/bench_startup.py [--pages Home Search] [--repeat 5] [--json out.json]
+
+For each page, "cold" runs the app in a fresh AppTest session after clearing
+Streamlit's data/resource caches (the first request a new worker serves),
+and "warm" reruns the same session with the caches populated (what every
+widget interaction pays). Pages are opened with the ?page= query parameter.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+PAGES = ["Home", "Search", "Analytics", "About"]
+
+
+def run_app(page, timeout):
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    at.query_params["page"] = page
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"{page}: {at.exception[0].value}")
+    return at, elapsed
+
+
+def bench_page(page, repeat, timeout):
+    cold, warm = [], []
+    for _ in range(repeat):
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        at, elapsed = run_app(page, timeout)
+        cold.append(elapsed)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            at.run()
+            warm.append(time.perf_counter() - start)
+    return {
+        "cold_ms": summarize(cold),
+        "warm_ms": summarize(warm),
+    }
+
+
+def summarize(samples):
+    samples = np.asarray(samples) * 1000
+    return {
+        "median": round(float(np.median(samples)), 2),
+        "p95": round(float(np.percentile(samples, 95)), 2),
+        "n": len(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    # The app resolves its data and cache paths from its own directory
+    os.chdir(os.path.dirname(APP))
+    # Warm-up run so one-off module imports are not charged to the first page
+    run_app(PAGES[0], args.timeout)
+
+    results = {page: bench_page(page, args.repeat, args.timeout) for page in args.pages}
+    print(f"{'page':<10} {'cold p50':>9} {'cold p95':>9} {'warm p50':>9} {'warm p95':>9}   (ms)")
+    for page, result in results.items():
+        cold, warm = result["cold_ms"], result["warm_ms"]
+        print(f"{page:<10} {cold['median']:>9.1f} {cold['p95']:>9.1f} {warm['median']:>9.1f} {warm['p95']:>9.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
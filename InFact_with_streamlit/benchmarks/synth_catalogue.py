@@ -0,0 +1,174 @@
+"""Synthetic catalogues in the schema of food_data_updated.csv, at any size.
+
+    python benchmarks/synth_catalogue.py 100k [--out path.csv] [--seed 0]
+
+Each generated row starts from a shipped row picked at random, so categories,
+ingredient lists and types, harmful flags and the other descriptive columns
+keep their shipped joint distribution. On top of that:
+
+- brands follow a Zipf law over a pool that grows with the catalogue (as
+  Heaps' law, n^0.6): the shipped brands, most frequent first, take the head
+  and made-up brands the long tail; 40% of rows keep their template's brand
+- product names gain a variant ("Lite", "Family Size", ...) and half of them
+  a product-line word, drawn by Zipf from a pool growing with sqrt(n), so the
+  search vocabulary keeps growing like a real catalogue's
+- 30% of rows gain an extra ingredient, drawn by shipped frequency and
+  appended to the top level of Ingredient Details, and Total Ingredients
+  counts it (harmful counts and flags are left as the template's)
+
+Rows are generated and written CHUNK_ROWS at a time, so 10M rows need no more
+memory than one chunk. The output depends only on the size and the seed.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE = os.path.join(APP_DIR, "food_data_updated.csv")
+CHUNK_ROWS = 100_000
+
+VARIANTS = [
+    "Original", "Classic", "Lite", "Family Size", "Mini", "Organic", "Spicy", "Low Sodium",
+    "Sugar Free", "Value Pack", "Extra Crunchy", "Whole Grain", "Double", "Party Pack", "Zero",
+]
+SYLLABLES = [
+    "ka", "lo", "mi", "ra", "ten", "vo", "sha", "pu", "zel", "dor", "fin", "gra", "bel", "cro",
+    "nut", "mar", "sol", "tri", "ve", "qui", "ban", "rio", "del", "ost", "ami", "len", "cor",
+]
+BRAND_SUFFIXES = ["Foods", "Farms", "Kitchen", "& Co.", "Naturals", "Brands", "Bakery", "Dairy"]
+
+
+def parse_size(text):
+    """Row count from "2500", "10k" or "1M"."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([kKmM]?)", text.strip())
+    if not match:
+        raise ValueError(f"not a catalogue size: {text!r}")
+    return int(float(match[1]) * {"": 1, "k": 10**3, "m": 10**6}[match[2].lower()])
+
+
+def zipf(n, exponent=0.8):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def made_up_words(n, rng, syllables=(2, 4)):
+    """`n` distinct capitalised words of random syllables."""
+    words = {}
+    while len(words) < n:
+        count = int(rng.integers(syllables[0], syllables[1] + 1))
+        word = "".join(rng.choice(SYLLABLES, size=count)).capitalize()
+        words.setdefault(word, None)
+    return list(words)
+
+
+def top_level_ingredients(details):
+    """Ingredient names of one Ingredient Details text, sub-ingredients dropped."""
+    previous = None
+    while previous != details:
+        previous, details = details, re.sub(r"\([^()]*\)", "", details)
+    # Some shipped lists are numbered ("1 Water, 2 Sugar, ...")
+    names = (re.sub(r"^\d+[.)]?\s+", "", name.strip()) for name in details.split(","))
+    return [name for name in names if 2 < len(name) <= 40]
+
+
+class CatalogueGenerator:
+    def __init__(self, n_rows, seed=0, source=SOURCE):
+        self.n_rows = n_rows
+        self.seed = seed
+        template = pd.read_csv(source, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+        # The shipped CSV ends every line with empty separator-only columns
+        self.template = template.loc[:, ~template.columns.str.startswith("Unnamed")]
+        scale = max(n_rows / len(self.template), 1.0)
+        rng = np.random.default_rng([seed, 0])
+
+        shipped = self.template["Brand"].value_counts().index.tolist()
+        n_brands = int(len(shipped) * scale ** 0.6)
+        new = made_up_words(max(n_brands - len(shipped), 0), rng)
+        suffixes = rng.choice(BRAND_SUFFIXES, size=len(new))
+        self.brands = np.array(shipped + [f"{word} {suffix}" for word, suffix in zip(new, suffixes)], dtype=object)
+        self.brand_weights = zipf(len(self.brands))
+
+        self.lines = np.array(made_up_words(int(50 * scale ** 0.5), rng), dtype=object)
+        self.line_weights = zipf(len(self.lines))
+
+        # Lists written as "Potato Bites (Potatoes, ...)" name the product itself
+        counts = Counter(
+            name
+            for details, product in zip(self.template["Ingredient Details"], self.template["Product Name"])
+            for name in top_level_ingredients(details)
+            if name != product
+        )
+        self.ingredients = np.array(list(counts), dtype=object)
+        self.ingredient_weights = np.array(list(counts.values()), dtype=float)
+        self.ingredient_weights /= self.ingredient_weights.sum()
+
+    def chunk(self, index, n):
+        """Rows [index * CHUNK_ROWS, ... + n) of the catalogue."""
+        rng = np.random.default_rng([self.seed, index + 1])
+        rows = self.template.iloc[rng.integers(0, len(self.template), size=n)].reset_index(drop=True)
+
+        brands = self.brands[rng.choice(len(self.brands), size=n, p=self.brand_weights)]
+        rows["Brand"] = np.where(rng.random(n) < 0.4, rows["Brand"].to_numpy(dtype=object), brands)
+
+        variants = np.array([""] * len(VARIANTS) + [" " + variant for variant in VARIANTS], dtype=object)
+        lines = " " + self.lines[rng.choice(len(self.lines), size=n, p=self.line_weights)]
+        names = rows["Product Name"].to_numpy(dtype=object) + variants[rng.integers(0, len(variants), size=n)]
+        rows["Product Name"] = np.where(rng.random(n) < 0.5, names + lines, names)
+
+        extra = rng.random(n) < 0.3
+        added = self.ingredients[rng.choice(len(self.ingredients), size=int(extra.sum()), p=self.ingredient_weights)]
+        details = rows["Ingredient Details"].to_numpy(dtype=object)
+        details[extra] = details[extra] + ", " + added
+        rows["Ingredient Details"] = details
+        total = pd.to_numeric(rows["Total Ingredients"], errors="coerce")
+        counted = extra & total.notna().to_numpy()
+        rows.loc[counted, "Total Ingredients"] = (total[counted] + 1).astype(int).astype(str)
+        return rows
+
+    def chunks(self, chunk_rows=CHUNK_ROWS):
+        for index, start in enumerate(range(0, self.n_rows, chunk_rows)):
+            yield self.chunk(index, min(chunk_rows, self.n_rows - start))
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Written next to the target and renamed, so an interrupted run leaves no partial catalogue
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "w", encoding="utf-8-sig", newline="") as f:
+            for i, rows in enumerate(self.chunks()):
+                rows.to_csv(f, index=False, header=i == 0)
+        os.replace(partial, path)
+        return path
+
+
+def synthetic_catalogue(size, directory, seed=0):
+    """Path of the synthetic catalogue of `size` rows in `directory`, generated if missing."""
+    n_rows = parse_size(size) if isinstance(size, str) else size
+    path = os.path.join(directory, f"synthetic-{n_rows}-seed{seed}.csv")
+    if not os.path.exists(path):
+        CatalogueGenerator(n_rows, seed).write(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("size", help="number of rows, e.g. 10k, 100k, 1M, 10M")
+    parser.add_argument("--out", help="CSV to write (default: synthetic-<rows>-seed<seed>.csv here)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    n_rows = parse_size(args.size)
+    out = args.out or f"synthetic-{n_rows}-seed{args.seed}.csv"
+    start = time.perf_counter()
+    CatalogueGenerator(n_rows, args.seed).write(out)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {n_rows:,} rows to {out} in {elapsed:.1f}s ({n_rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
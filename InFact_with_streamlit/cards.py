@@ -0,0 +1,82 @@
+"""HTML for Search result cards, rendered one page at a time.
+
+A page of cards is assembled with whole-column string operations and emitted
+as a single markdown block, instead of one Streamlit call per row and field.
+"""
+import html
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZE = 10
+
+
+def page_count(n_results, page_size=PAGE_SIZE):
+    return max(1, -(-n_results // page_size))
+
+
+def page_slice(n_results, page, page_size=PAGE_SIZE):
+    page = min(max(int(page), 1), page_count(n_results, page_size))
+    return slice((page - 1) * page_size, min(page * page_size, n_results))
+
+
+def escaped(values):
+    """HTML-escaped text of a column; categoricals escape each category once."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.cat.rename_categories([html.escape(str(c)) for c in values.cat.categories])
+        return values.astype(str)
+    return values.astype(str).map(html.escape)
+
+
+def _optional(values, template):
+    text = escaped(values)
+    return pd.Series(
+        np.where(text.isin(["N/A", ""]), "", template[0] + text + template[1]),
+        index=values.index,
+    )
+
+
+def cards_html(results, extras=None):
+    """One HTML block holding a card per row of `results`.
+
+    `extras` is an optional sequence of pre-rendered HTML appended to each card.
+    """
+    if results.empty:
+        return ""
+    colour = np.where(results['harmful_status'] == 'Yes', '#ef4444', '#4CAF50')
+    cards = (
+        '<div class="modern-card">'
+        + '<h3>' + escaped(results['product_name']) + '</h3>'
+        + '<p><strong>Brand:</strong> ' + escaped(results['brand']) + '</p>'
+        + '<p><strong>Category:</strong> ' + escaped(results['category']) + '</p>'
+        + '<p><strong>Safety Status:</strong> <span style="color: ' + colour + '">'
+        + escaped(results['is_harmful?']) + '</span></p>'
+        + '<div class="neumorphic" style="margin-top: 1rem; padding: 1rem;">'
+        + '<p><strong>Total Ingredients:</strong> ' + results['total_ingredients'].astype(str) + '</p>'
+        + '<p><strong>Harmful Ingredients:</strong> ' + results['harmful_ingredient_count'].astype(str) + '</p>'
+        + '</div>'
+        + _optional(results['nutritional_impact'], ('<p><strong>Nutritional Impact:</strong> ', '</p>'))
+        + _optional(results['healthy_alternative'], ('<p><strong>Healthy Alternative:</strong> ', '</p>'))
+    )
+    if extras is not None:
+        cards = cards + pd.Series(list(extras), index=results.index)
+    return "".join(cards + '</div>')
+
+
+def product_links(label, products):
+    """A labelled, comma-separated line of "name (brand)" entries, or ''."""
+    if products.empty:
+        return ""
+    entries = escaped(products['product_name']) + ' (' + escaped(products['brand']) + ')'
+    return f'<p><strong>{label}:</strong> {", ".join(entries)}</p>'
+
+
+def risk_html(score, contributions, limit=4):
+    """Ingredient risk score line with the largest per-ingredient contributions."""
+    if not contributions:
+        return '<p><strong>Ingredient risk score:</strong> 0</p>'
+    details = ", ".join(
+        f'<span title="{html.escape(reason)}">{html.escape(name)} (+{weight:g})</span>'
+        for name, weight, reason in contributions[:limit]
+    )
+    return f'<p><strong>Ingredient risk score:</strong> {score:g} &mdash; {details}</p>'
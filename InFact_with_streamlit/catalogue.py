@@ -0,0 +1,515 @@
+"""Live product catalogue: the cleaned frame plus everything derived from it.
+
+A Snapshot bundles one version of the catalogue with its search index,
+ingredient table, similarity model, scores and aggregates. CatalogueStore
+serves the current snapshot and watches DATA_FILE: when the file's content
+hash changes, its rows are diffed against the current ones by (brand, product
+name) and the next snapshot is derived from the current one by applying only
+that delta. It watches RULES_FILE too: edited rules swap in a snapshot
+sharing every structure but the harmful scorer, which is rebuilt. The swap is
+one attribute assignment, so a reader keeps the snapshot it started with and
+never sees a half-updated one.
+
+After a delta, unchanged rows keep their relative order and come first;
+changed and added rows follow in file order. Row ids are therefore only
+meaningful within one snapshot.
+
+Several app processes on one host can share a single loader instead:
+
+    python catalogue.py publish   # load, then republish whenever DATA_FILE changes
+
+writes each snapshot under SHARED_DIR as an Arrow file plus flat .npy arrays,
+and SharedCatalogue attaches to the latest one by memory-mapping them. The
+pages live in the OS page cache once per host, however many workers map them.
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+import weakref
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+import config
+import metrics
+from analytics import AnalyticsCube
+from ann_index import LSHIndex
+from datastore import file_hash, load_catalogue, read_cache, write_cache
+from figures import FigureCache
+from filters import FilterPipeline
+from ingredients import IngredientParser, IngredientTable
+from queries import CatalogueQueries
+from scoring import HarmfulScorer, load_rules
+from search_index import SearchIndex
+from similarity import SimilarityModel
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ("brand", "product_name")
+
+
+def row_keys(data):
+    """(brand, product name) key of every row; repeated keys are allowed."""
+    keys = None
+    for column in KEY_COLUMNS:
+        values = data[column].astype(str).str.strip().str.lower()
+        keys = values if keys is None else keys + "\x1f" + values
+    return keys.to_numpy()
+
+
+def row_hashes(data):
+    return pd.util.hash_pandas_object(data, index=False).to_numpy()
+
+
+def _numbered(keys):
+    # Number repeats of a key so every entry can be matched at most once
+    keys = pd.Series(keys, dtype=object)
+    return pd.Index(keys + "\x1f" + keys.groupby(keys, sort=False).cumcount().astype(str))
+
+
+def _match(old, new):
+    return _numbered(old).get_indexer(_numbered(new))
+
+
+def diff(old_keys, old_hashes, new_keys, new_hashes):
+    """Match the rows of a new catalogue version against the current ones.
+
+    Identical rows are paired first by key and content hash, then the rest by
+    key alone, so editing or deleting one of several rows sharing a key only
+    touches that row. Returns (remap, layout, counts): `remap` maps every
+    current row id to its id in the new version (-1 when the row was changed
+    or removed), and `layout` lists the new rows' file positions in new
+    row-id order.
+    """
+    unchanged_from = _match(
+        old_keys + "\x1f" + old_hashes.astype(str).astype(object),
+        new_keys + "\x1f" + new_hashes.astype(str).astype(object),
+    )
+    unchanged = unchanged_from >= 0
+    old_left = np.ones(len(old_keys), dtype=bool)
+    old_left[unchanged_from[unchanged]] = False
+    old_rest, new_rest = np.flatnonzero(old_left), np.flatnonzero(~unchanged)
+    changed_from = _match(old_keys[old_rest], new_keys[new_rest])
+    kept = np.flatnonzero(unchanged)
+    kept = kept[np.argsort(unchanged_from[kept], kind="stable")]
+    remap = np.full(len(old_keys), -1, dtype=np.int64)
+    remap[unchanged_from[kept]] = np.arange(len(kept))
+    layout = np.concatenate([kept, new_rest])
+    n_changed = int((changed_from >= 0).sum())
+    counts = {
+        "added": len(new_rest) - n_changed,
+        "changed": n_changed,
+        "removed": len(old_rest) - n_changed,
+    }
+    return remap, layout, counts
+
+
+class Snapshot:
+    def __init__(self, data, digest, search_index, ingredient_table, similarity_model,
+                 harmful_scorer, analytics_cube, keys=None, hashes=None, version=1, snapshot_id=None):
+        self.data = data
+        self.digest = digest
+        self.version = version
+        # Versions restart at 1 with every store, and a delta-applied snapshot
+        # orders rows unlike a full build of the same file, so row ids are
+        # keyed by an id no other snapshot shares
+        self.id = snapshot_id or f"{digest[:12]}-{version}-{uuid.uuid4().hex[:12]}"
+        self._keys = keys
+        self._hashes = hashes
+        self.search_index = search_index
+        self.ingredient_table = ingredient_table
+        # A SimilarityModel, or a function fitting one
+        self._similarity_model = None if callable(similarity_model) else similarity_model
+        self._build_similarity = similarity_model if callable(similarity_model) else None
+        self._lock = threading.Lock()
+        self.harmful_scorer = harmful_scorer
+        self.analytics_cube = analytics_cube
+        # Result caches are per snapshot, so they can never serve stale rows
+        self.filter_pipeline = FilterPipeline(data, search_index, ingredient_table)
+        self.figure_cache = FigureCache(analytics_cube)
+        self.queries = CatalogueQueries(self)
+
+    # Fitting the similarity model (and importing scikit-learn) is left out
+    # of loading: the store fits it in the background once the snapshot is
+    # served, and a lookup arriving before that waits for the fit
+    @property
+    def similarity_model(self):
+        if self._similarity_model is None:
+            with self._lock:
+                if self._similarity_model is None:
+                    self._similarity_model = self._build_similarity()
+        return self._similarity_model
+
+    @property
+    def similarity_built(self):
+        return self._similarity_model is not None
+
+    def fit_in_background(self):
+        """Fit the similarity model on a daemon thread, if it is not fitted yet."""
+        if self.similarity_built:
+            return
+
+        def fit():
+            try:
+                self.similarity_model
+            except Exception as e:
+                # The first lookup retries the fit
+                logger.warning("Similarity model fit failed: %s", e)
+
+        threading.Thread(target=fit, name="similarity-fit", daemon=True).start()
+
+    # Row keys and hashes are only needed to diff against a new version
+    @property
+    def keys(self):
+        if self._keys is None:
+            self._keys = row_keys(self.data)
+        return self._keys
+
+    @property
+    def hashes(self):
+        if self._hashes is None:
+            self._hashes = row_hashes(self.data)
+        return self._hashes
+
+    def with_scorer(self, harmful_scorer):
+        """This snapshot scored by `harmful_scorer`: the same rows, and so the
+        same row ids, under a new id."""
+        return Snapshot(
+            self.data,
+            self.digest,
+            self.search_index,
+            self.ingredient_table,
+            self._similarity_model or (lambda: self.similarity_model),
+            harmful_scorer,
+            self.analytics_cube,
+            keys=self._keys,
+            hashes=self._hashes,
+            version=self.version + 1,
+        )
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        write_cache(self.data, os.path.join(directory, "catalogue.arrow"))
+        self.search_index.save(os.path.join(directory, "search"))
+        self.ingredient_table.save(os.path.join(directory, "ingredients"))
+        # Fitted here if it never was, so readers of a shared snapshot never fit it
+        self.similarity_model.save(os.path.join(directory, "similarity"))
+        if self.similarity_model.ann is not None:
+            self.similarity_model.ann.save(os.path.join(directory, "similarity", "ann"))
+        self.harmful_scorer.save(os.path.join(directory, "scoring"))
+        self.analytics_cube.save(os.path.join(directory, "analytics"))
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"digest": self.digest, "version": self.version, "id": self.id}, f)
+
+    @classmethod
+    def load(cls, directory):
+        """A read-only snapshot over the memory-mapped files written by save()."""
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        ingredient_table = IngredientTable.load(os.path.join(directory, "ingredients"))
+        similarity_model = SimilarityModel.load(os.path.join(directory, "similarity"))
+        similarity_model.ann = LSHIndex.load(os.path.join(directory, "similarity", "ann"))
+        return cls(
+            read_cache(os.path.join(directory, "catalogue.arrow"), zero_copy=True),
+            meta["digest"],
+            SearchIndex.load(os.path.join(directory, "search")),
+            ingredient_table,
+            similarity_model,
+            HarmfulScorer.load(os.path.join(directory, "scoring"), ingredient_table),
+            AnalyticsCube.load(os.path.join(directory, "analytics")),
+            version=meta["version"],
+            # Published before snapshots had ids: the directory name is unique too
+            snapshot_id=meta.get("id", os.path.basename(os.path.normpath(directory))),
+        )
+
+
+class Reloading:
+    """Background polling shared by the catalogue sources; subclasses
+    implement refresh() and set self.snapshot."""
+
+    def __init__(self):
+        self.last_error = None
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def watch(self, interval=None):
+        """Call refresh() every `interval` seconds on a daemon thread, until
+        stop() is called or the source is no longer referenced."""
+        interval = config.RELOAD_INTERVAL if interval is None else interval
+        if interval <= 0 or self._watcher is not None:
+            return
+        # The thread holds the source weakly, so dropping it (as clearing
+        # st.cache_resource does) frees its snapshot and ends the thread
+        source_ref, stop = weakref.ref(self), self._stop
+
+        def run():
+            while not stop.wait(interval):
+                source = source_ref()
+                if source is None:
+                    return
+                source._poll()
+                del source
+
+        self._watcher = threading.Thread(target=run, name="catalogue-watcher", daemon=True)
+        self._watcher.start()
+
+    def _poll(self):
+        try:
+            self.refresh()
+            self.last_error = None
+        except Exception as e:
+            # Keep serving the current snapshot
+            self.last_error = e
+            logger.warning("Catalogue reload failed: %s", e)
+
+    def stop(self):
+        self._stop.set()
+
+
+class CatalogueStore(Reloading):
+    def __init__(self, path=None, rules=None):
+        super().__init__()
+        self.path = path or config.DATA_FILE
+        # Shared across versions, so a reload only parses ingredient texts it
+        # has not seen before; trimmed to the current texts after each reload
+        self.parser = IngredientParser()
+        self.reloads = 0
+        self.last_reload = None
+        self._lock = threading.Lock()
+        self._stat = _stat(self.path)
+        # Rules passed in are fixed; otherwise RULES_FILE is watched like DATA_FILE
+        self.rules_path = None if rules is not None else config.RULES_FILE
+        self._rules_stat = _stat(self.rules_path)
+        self.rules = load_rules(self.rules_path) if rules is None else rules
+        digest = file_hash(self.path)
+        with metrics.timed("load_data"):
+            self.snapshot = self.build(load_catalogue(self.path, digest), digest, self.rules)
+        self.snapshot.fit_in_background()
+
+    @staticmethod
+    def fit_similarity(data):
+        model = SimilarityModel.from_frame(data)
+        if config.ANN_TABLES > 0:
+            # Offline-built LSH index (python ann_index.py build); exact search if absent
+            model.ann = LSHIndex.load(config.ANN_DIR, fingerprint=model.fingerprint)
+        return model
+
+    def build(self, data, digest, rules=None, version=1):
+        """A snapshot of `data` with every structure built from scratch (the
+        similarity model later, see Snapshot.similarity_model)."""
+        ingredient_table = IngredientTable.from_frame(data, self.parser)
+        return Snapshot(
+            data,
+            digest,
+            SearchIndex.from_frame(data),
+            ingredient_table,
+            partial(self.fit_similarity, data),
+            HarmfulScorer(ingredient_table, rules),
+            AnalyticsCube(data),
+            version=version,
+        )
+
+    def apply(self, data, digest):
+        """The snapshot for a new version `data`, derived from the current one.
+
+        Returns (snapshot, counts of added/changed/removed rows).
+        """
+        current = self.snapshot
+        rules = self.rules
+        if list(data.columns) != list(current.data.columns):
+            snapshot = self.build(data, digest, rules, current.version + 1)
+            return snapshot, {"added": len(data), "changed": 0, "removed": len(current.data)}
+        keys, hashes = row_keys(data), row_hashes(data)
+        remap, layout, counts = diff(current.keys, current.hashes, keys, hashes)
+        data = data.iloc[layout].reset_index(drop=True)
+        appended = data.iloc[int((remap >= 0).sum()):]
+        removed = current.data.iloc[np.flatnonzero(remap < 0)]
+        model = current.similarity_model if current.similarity_built else None
+        if model is None:
+            # The current one is still being fitted: fit this one from scratch
+            similarity_model = partial(self.fit_similarity, data)
+        elif model.stale_rows + len(appended) > config.SIMILARITY_REFIT_FRACTION * len(data):
+            similarity_model = SimilarityModel.from_frame(data)
+            if model.ann is not None:
+                similarity_model.ann = LSHIndex.build(
+                    similarity_model.matrix,
+                    n_tables=model.ann.n_tables,
+                    fingerprint=similarity_model.fingerprint,
+                )
+        else:
+            similarity_model = model.updated(remap, appended)
+        ingredient_table = IngredientTable.from_frame(data, self.parser)
+        snapshot = Snapshot(
+            data,
+            digest,
+            current.search_index.updated(remap, appended),
+            ingredient_table,
+            similarity_model,
+            HarmfulScorer(ingredient_table, rules),
+            current.analytics_cube.updated(appended, removed),
+            keys=keys[layout],
+            hashes=hashes[layout],
+            version=current.version + 1,
+        )
+        return snapshot, counts
+
+    def refresh(self):
+        """Apply changes to RULES_FILE and DATA_FILE, if any; True when a new
+        snapshot was swapped in."""
+        with self._lock:
+            rescored = self._refresh_rules()
+            return self._refresh_data() or rescored
+
+    def _refresh_rules(self):
+        stat = _stat(self.rules_path)
+        if stat is None or stat == self._rules_stat:
+            return False
+        # Recorded before loading, so a broken file is retried only once it changes again
+        self._rules_stat = stat
+        rules = load_rules(self.rules_path)
+        if rules == self.rules:
+            return False
+        started = time.perf_counter()
+        current = self.snapshot
+        with metrics.timed("rescore"):
+            # A new scorer over the same incidence matrix; the live one is
+            # shared by readers and left untouched
+            scorer = HarmfulScorer(current.ingredient_table, rules, matrix=current.harmful_scorer.matrix)
+            snapshot = current.with_scorer(scorer)
+        self.rules = rules
+        self.snapshot = snapshot
+        snapshot.fit_in_background()
+        self.reloads += 1
+        self.last_reload = {"rules": len(rules), "version": snapshot.version, "seconds": time.perf_counter() - started}
+        logger.info("Harmful rules reloaded: %s", self.last_reload)
+        return True
+
+    def _refresh_data(self):
+        stat = _stat(self.path)
+        if stat is None or stat == self._stat:
+            return False
+        self._stat = stat
+        digest = file_hash(self.path)
+        if digest == self.snapshot.digest:
+            return False
+        started = time.perf_counter()
+        with metrics.timed("reload_data"):
+            snapshot, counts = self.apply(load_catalogue(self.path, digest), digest)
+        self.parser.retain(snapshot.data["ingredient_details"].tolist())
+        self.snapshot = snapshot
+        snapshot.fit_in_background()
+        self.reloads += 1
+        self.last_reload = dict(counts, version=snapshot.version, seconds=time.perf_counter() - started)
+        logger.info("Catalogue reloaded: %s", self.last_reload)
+        return True
+
+
+def _stat(path):
+    """(mtime, size) of `path`, or None when there is no such file."""
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _published_name(root):
+    try:
+        with open(os.path.join(root, "CURRENT")) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def publish(snapshot, root=None, keep=2):
+    """Write `snapshot` under `root` and make it the one workers attach to.
+
+    Snapshots are written to a temporary directory and renamed, then the
+    CURRENT pointer is replaced, so a worker never opens a partial snapshot.
+    Only the newest `keep` snapshots are kept.
+    """
+    root = root or config.SHARED_DIR
+    os.makedirs(root, exist_ok=True)
+    name = f"{snapshot.digest[:16]}-{time.time_ns()}"
+    partial = os.path.join(root, f".{name}.tmp")
+    snapshot.save(partial)
+    os.replace(partial, os.path.join(root, name))
+    pointer = os.path.join(root, f".CURRENT.{os.getpid()}.tmp")
+    with open(pointer, "w") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(root, "CURRENT"))
+    published = sorted(
+        (entry for entry in os.listdir(root) if not entry.startswith(".") and entry != "CURRENT"),
+        key=lambda entry: int(entry.rsplit("-", 1)[-1]),
+    )
+    for old in published[:-keep]:
+        # Workers may still have it mapped; that only blocks removal on Windows
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return os.path.join(root, name)
+
+
+def open_catalogue(watch=True):
+    """The catalogue source for this process: the published snapshot when
+    INFACT_SHARED=1 and one exists, otherwise a private CatalogueStore."""
+    source = None
+    if config.SHARED:
+        try:
+            source = SharedCatalogue()
+        except FileNotFoundError:
+            # Nothing published yet: serve from a private copy
+            logger.warning("No catalogue published in %s; loading a private copy", config.SHARED_DIR)
+    if source is None:
+        source = CatalogueStore()
+    if watch:
+        source.watch()
+    return source
+
+
+class SharedCatalogue(Reloading):
+    """Read-only view of the latest snapshot published under SHARED_DIR."""
+
+    def __init__(self, root=None):
+        super().__init__()
+        self.root = root or config.SHARED_DIR
+        self.name = None
+        self.snapshot = None
+        if not self.refresh():
+            raise FileNotFoundError(f"No catalogue published in {self.root}")
+
+    def refresh(self):
+        """Attach to a newer published snapshot, if any; True when one was swapped in."""
+        name = _published_name(self.root)
+        if name is None or name == self.name:
+            return False
+        with metrics.timed("attach_data"):
+            self.snapshot = Snapshot.load(os.path.join(self.root, name))
+        self.name = name
+        return True
+
+
+def serve_published(interval=None):
+    """Publish the catalogue, then republish it after every reload."""
+    interval = config.RELOAD_INTERVAL if interval is None else interval
+    store = CatalogueStore()
+    print(f"Published {publish(store.snapshot)}")
+    while interval > 0:
+        time.sleep(interval)
+        try:
+            if store.refresh():
+                print(f"Published {publish(store.snapshot)} {store.last_reload}")
+        except Exception as e:
+            logger.warning("Catalogue reload failed: %s", e)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["publish"]:
+        sys.exit(__doc__)
+    serve_published()
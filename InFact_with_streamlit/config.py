@@ -0,0 +1,52 @@
+"""Runtime settings for InFact, overridable through environment variables."""
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DATA_FILE = os.environ.get("INFACT_DATA_FILE", os.path.join(BASE_DIR, "food_data_updated.csv"))
+CACHE_DIR = os.environ.get("INFACT_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+# Rows parsed and cleaned at a time when DATA_FILE is ingested into the cache;
+# ingestion memory depends on this, not on the size of the file
+INGEST_CHUNK_ROWS = int(os.environ.get("INFACT_INGEST_CHUNK_ROWS", "50000"))
+
+# Similarity search: number of LSH tables probed per query. More tables means
+# better recall and slower queries; 0 disables the ANN index (exact search).
+ANN_TABLES = int(os.environ.get("INFACT_ANN_TABLES", "0"))
+ANN_DIR = os.path.join(CACHE_DIR, "ann")
+
+# Lottie animations: bundled assets, writable fetch cache, and network limits.
+# Failed fetches are retried at most once per LOTTIE_RETRY_AFTER seconds.
+ASSET_DIR = os.path.join(BASE_DIR, "assets", "lottie")
+LOTTIE_CACHE_DIR = os.path.join(CACHE_DIR, "lottie")
+LOTTIE_TIMEOUT = float(os.environ.get("INFACT_LOTTIE_TIMEOUT", "3"))
+LOTTIE_RETRY_AFTER = float(os.environ.get("INFACT_LOTTIE_RETRY_AFTER", "300"))
+
+# Harmful-ingredient rules (pattern -> severity weight and reason) used to
+# score products from their parsed ingredient lists
+RULES_FILE = os.environ.get("INFACT_RULES_FILE", os.path.join(BASE_DIR, "harmful_rules.json"))
+
+# Seconds between checks of DATA_FILE and RULES_FILE for changes; 0 disables
+# live reloading.
+# Appended rows are vectorised with the existing TF-IDF fit until they make up
+# more than SIMILARITY_REFIT_FRACTION of the catalogue, then it is refitted.
+RELOAD_INTERVAL = float(os.environ.get("INFACT_RELOAD_INTERVAL", "5"))
+SIMILARITY_REFIT_FRACTION = float(os.environ.get("INFACT_SIMILARITY_REFIT_FRACTION", "0.2"))
+
+# Shared catalogue for several app processes on one host: `python catalogue.py
+# publish` writes memory-mappable snapshots to SHARED_DIR, and apps started
+# with INFACT_SHARED=1 attach to the latest one instead of loading their own.
+SHARED = os.environ.get("INFACT_SHARED", "0") == "1"
+SHARED_DIR = os.environ.get("INFACT_SHARED_DIR", os.path.join(CACHE_DIR, "shared"))
+
+# Search page: shorter queries are not run (they match most of the catalogue)
+MIN_QUERY_LENGTH = int(os.environ.get("INFACT_MIN_QUERY_LENGTH", "2"))
+
+# Stage timings (metrics.py); off by default, when they cost one flag check.
+# The sidebar performance panel is shown to visitors opening the app with
+# ?admin=<ADMIN_TOKEN>, and not at all while no token is set.
+METRICS = os.environ.get("INFACT_METRICS", "0") == "1"
+ADMIN_TOKEN = os.environ.get("INFACT_ADMIN_TOKEN", "")
+
+# Headless JSON API (python api.py)
+API_HOST = os.environ.get("INFACT_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("INFACT_API_PORT", "8601"))
@@ -0,0 +1,295 @@
+"""Loading and cleaning of the product catalogue, independent of Streamlit.
+
+The cleaned frame is cached on disk as an uncompressed Arrow IPC (feather v2)
+file named after the CSV's content hash. Startup memory-maps that file and
+only falls back to the CSV when the hash changes.
+
+The CSV is never parsed whole: it is read, cleaned and appended to the cache
+INGEST_CHUNK_ROWS rows at a time, so ingesting a multi-GB feed takes the
+memory of one chunk. Categorical columns share one dictionary across the
+file, which each chunk extends with the values it brings (Arrow dictionary
+deltas); the categories are sorted back when the cache is read.
+
+    python datastore.py build     # write the cache for the configured CSV
+"""
+import hashlib
+import logging
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever clean_frame() or the cache layout changes so stale caches are
+# not picked up
+CACHE_VERSION = 5
+
+# Typed schema of the cleaned catalogue. Low-cardinality text is categorical so
+# filters compare integer codes; free text stays as plain strings.
+CATEGORY_COLUMNS = (
+    "brand", "category", "ingredient_types", "is_harmful?", "reason_for_harmful",
+    "daily_limit", "suitable_for_kids", "suitable_for_teens", "suitable_for_elderly",
+    "nutritional_impact", "translation_availability", "country_of_manufacturing",
+    "expiration_detail",
+)
+TEXT_COLUMNS = ("product_name", "ingredient_details", "healthy_alternative", "alternative_description")
+COUNT_COLUMNS = ("harmful_ingredient_count", "total_ingredients")
+COUNT_DTYPE = "int16"
+
+# Normalised harmfulness derived from the free-text "Is Harmful?" column
+HARMFUL_LEVELS = ("Yes", "No", "Maybe", "Unknown")
+HARMFUL_DTYPE = pd.CategoricalDtype(HARMFUL_LEVELS)
+
+
+def _harmful_level(value):
+    value = str(value).strip().lower()
+    if value == "yes":
+        return "Yes"
+    if value == "no":
+        return "No"
+    if value in ("", "n/a", "nan"):
+        return "Unknown"
+    return "Maybe"
+
+
+def harmful_status(values):
+    """Map raw "Is Harmful?" values onto HARMFUL_LEVELS, once per distinct value."""
+    values = values.astype("category")
+    mapping = {value: _harmful_level(value) for value in values.cat.categories}
+    return values.map(mapping).astype(HARMFUL_DTYPE)
+
+
+def _text(values):
+    return values.astype(object).where(values.notna(), "N/A").astype(str)
+
+
+def _column_name(col):
+    return col.strip().lower().replace(' ', '_')
+
+
+def clean_frame(data):
+    data.columns = [_column_name(col) for col in data.columns]
+    # The CSV ends every line with separators; columns without a header carry
+    # nothing the app can name, and dropping them whether or not some chunk
+    # has data in them keeps every chunk's columns the same
+    data = data.drop(columns=[col for col in data.columns if col.startswith('unnamed:')])
+    # Without the column nothing is known about harmfulness; the ingredient
+    # rules in scoring.py still rate every product
+    if 'is_harmful?' not in data.columns:
+        data['is_harmful?'] = 'N/A'
+    for col in TEXT_COLUMNS + CATEGORY_COLUMNS:
+        values = _text(data[col]) if col in data.columns else pd.Series("N/A", index=data.index)
+        data[col] = values.astype("category") if col in CATEGORY_COLUMNS else values
+    for col in COUNT_COLUMNS:
+        values = pd.to_numeric(data[col], errors='coerce') if col in data.columns else pd.Series(0, index=data.index)
+        data[col] = values.fillna(0).astype(COUNT_DTYPE)
+    for col in data.columns.difference(TEXT_COLUMNS + CATEGORY_COLUMNS + COUNT_COLUMNS):
+        if data[col].dtype == object:
+            data[col] = _text(data[col])
+    data['harmful_status'] = harmful_status(data['is_harmful?'])
+    return data
+
+
+def _read_options(path):
+    # Everything but the counts is read as text, so a chunk whose values all
+    # look like numbers, or are all missing, is typed the same as the rest
+    header = pd.read_csv(path, nrows=0).columns
+    return {"dtype": {col: str for col in header if _column_name(col) not in COUNT_COLUMNS}}
+
+
+def read_catalogue(path=None):
+    path = path or config.DATA_FILE
+    return clean_frame(pd.read_csv(path, **_read_options(path)))
+
+
+def read_chunks(path=None, chunk_rows=None):
+    """The cleaned catalogue as frames of at most `chunk_rows` rows."""
+    path = path or config.DATA_FILE
+    with pd.read_csv(path, chunksize=chunk_rows or config.INGEST_CHUNK_ROWS, **_read_options(path)) as reader:
+        for chunk in reader:
+            yield clean_frame(chunk)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# catalogue-v<CACHE_VERSION>-<CSV path hash>-<CSV content hash>.arrow; caches
+# named before the path was part of the name have no path hash
+CACHE_NAME_RE = re.compile(r"catalogue-v\d+-(?:([0-9a-f]{8})-)?[0-9a-f]{16}\.arrow")
+
+
+def _source_key(path):
+    return hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:8]
+
+
+def cache_path(path, digest):
+    return os.path.join(config.CACHE_DIR, f"catalogue-v{CACHE_VERSION}-{_source_key(path)}-{digest[:16]}.arrow")
+
+
+def prune_caches(keep):
+    """Delete the caches of `keep`'s CSV other than `keep`: its earlier
+    contents and earlier CACHE_VERSIONs. Caches of other CSVs sharing the
+    directory are left alone."""
+    directory = os.path.dirname(keep)
+    source = CACHE_NAME_RE.fullmatch(os.path.basename(keep))[1]
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        match = CACHE_NAME_RE.fullmatch(name)
+        # Caches without a path hash are never read any more, whoever wrote them
+        if match and match[1] in (source, None) and path != keep:
+            try:
+                # A process still reading one keeps its mapping until it is done
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def write_cache(data, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    # Write next to the target and rename, so readers never see a partial file
+    partial = f"{target}.{os.getpid()}.tmp"
+    with pa.OSFile(partial, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(partial, target)
+
+
+class _BatchEncoder:
+    """Arrow record batches of cleaned chunks, under the first chunk's schema.
+
+    Each categorical column gets one dictionary, in order of first
+    appearance, so a chunk's codes mean the same as every other chunk's and
+    only its new values are written.
+    """
+
+    def __init__(self, first):
+        self.codes = {col: {} for col in CATEGORY_COLUMNS}
+        self.schema = pa.schema([
+            pa.field(field.name, pa.dictionary(pa.int32(), pa.string())) if field.name in self.codes else field
+            for field in pa.Schema.from_pandas(first, preserve_index=False)
+        ])
+
+    def batch(self, chunk):
+        arrays = []
+        for field in self.schema:
+            values = chunk[field.name]
+            codes = self.codes.get(field.name)
+            if codes is None:
+                arrays.append(pa.Array.from_pandas(values, type=field.type))
+                continue
+            categories = values.cat.categories
+            mapping = np.fromiter(
+                (codes.setdefault(value, len(codes)) for value in categories), dtype=np.int32, count=len(categories)
+            )
+            indices = pa.array(mapping[values.cat.codes.to_numpy()], type=pa.int32())
+            arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(list(codes), type=pa.string())))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+
+def ingest(path, target, chunk_rows=None):
+    """Clean the CSV at `path` into the cache file `target`, one chunk at a
+    time; the number of rows written."""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    partial = f"{target}.{os.getpid()}.tmp"
+    started = time.perf_counter()
+    rows = 0
+    try:
+        with metrics.timed("ingest"), pa.OSFile(partial, "wb") as sink:
+            encoder = writer = None
+            try:
+                for chunk in read_chunks(path, chunk_rows):
+                    if writer is None:
+                        encoder = _BatchEncoder(chunk)
+                        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+                        writer = pa.ipc.new_file(sink, encoder.schema, options=options)
+                    writer.write_batch(encoder.batch(chunk))
+                    rows += len(chunk)
+            finally:
+                if writer is not None:
+                    writer.close()
+        if writer is None:
+            # A header-only file yields no chunk to take the schema from
+            write_cache(read_catalogue(path), target)
+            os.remove(partial)
+        else:
+            os.replace(partial, target)
+    except BaseException:
+        # A multi-GB partial file is not worth keeping
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    elapsed = time.perf_counter() - started
+    logger.info("Ingested %d rows from %s in %.1fs (%.0f rows/s)", rows, path, elapsed, rows / max(elapsed, 1e-9))
+    return rows
+
+
+def read_cache(target, zero_copy=False):
+    """The cached frame. With `zero_copy`, text columns become Arrow-backed
+    strings that point straight into the memory-mapped file instead of being
+    copied into Python objects, so processes mapping the same file share them.
+    """
+    with pa.memory_map(target, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    if zero_copy:
+        data = table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+    else:
+        data = table.to_pandas()
+    # Ingested caches list categories in order of appearance; sort them as
+    # astype("category") does, which filters and charts present
+    for col in CATEGORY_COLUMNS:
+        if col in data.columns and not data[col].cat.categories.is_monotonic_increasing:
+            data[col] = data[col].cat.reorder_categories(sorted(data[col].cat.categories))
+    return data
+
+
+def build_cache(path=None):
+    path = path or config.DATA_FILE
+    target = cache_path(path, file_hash(path))
+    rows = ingest(path, target)
+    prune_caches(target)
+    return target, rows
+
+
+def load_catalogue(path=None, digest=None):
+    """The cleaned catalogue, from the columnar cache when it is up to date.
+
+    `digest` is the CSV's file_hash() when the caller already computed it.
+    """
+    path = path or config.DATA_FILE
+    target = cache_path(path, digest or file_hash(path))
+    if os.path.exists(target):
+        try:
+            return read_cache(target)
+        except (OSError, pa.ArrowInvalid):
+            pass
+    try:
+        ingest(path, target)
+    except OSError:
+        # A read-only deployment still serves from the parsed CSV
+        return read_catalogue(path)
+    # Every reload of a changing feed writes a new cache; keep only this one
+    prune_caches(target)
+    return read_cache(target)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["build"]:
+        sys.exit(__doc__)
+    started = time.perf_counter()
+    target, rows = build_cache()
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {rows:,} rows to {target} in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
@@ -0,0 +1,159 @@
+"""Plotly figures for the Analytics page, built from the analytics cube and cached.
+
+Figures are keyed by (chart kind, category selection, theme) and stored as
+their serialized JSON spec in a size-bounded LRU, so a rerun that changes
+nothing chart-related skips both the aggregation and Plotly Express.
+Plotly itself is imported on the first figure, so only the Analytics page
+pays for it.
+"""
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import metrics
+
+CHART_TYPES = ["Bar", "Pie", "Line", "Scatter"]
+
+
+def themed(fig, theme):
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color=('white' if theme == 'dark' else 'black'))
+    )
+    return fig
+
+
+def _frame(totals):
+    # Plotly Express rejects empty x/y arrays, but accepts an empty frame
+    return pd.DataFrame({'x': totals.index.astype(object), 'y': totals.to_numpy()})
+
+
+def category_figure(cube, categories, chart_type):
+    import plotly.express as px
+
+    if chart_type == "Scatter":
+        summary = cube.summary(categories)
+        points = pd.DataFrame({
+            'x': summary['total_ingredients'] / summary['count'],
+            'y': summary['harmful_ingredients'] / summary['count'],
+            'size': summary['count'],
+        })
+        return px.scatter(
+            points,
+            x='x',
+            y='y',
+            size='size',
+            hover_name=points.index,
+            title="Ingredients vs Harmful Ingredients by Category",
+            labels={'x': 'Avg. Ingredients', 'y': 'Avg. Harmful Ingredients', 'size': 'Products'}
+        )
+    category_counts = _frame(cube.totals('category', categories))
+    if chart_type == "Pie":
+        return px.pie(
+            category_counts,
+            values='y',
+            names='x',
+            title="Category Distribution"
+        )
+    if chart_type == "Line":
+        return px.line(
+            category_counts,
+            x='x',
+            y='y',
+            markers=True,
+            title="Products by Category",
+            labels={'x': 'Category', 'y': 'Count'}
+        )
+    return px.bar(
+        category_counts,
+        x='x',
+        y='y',
+        title="Products by Category",
+        labels={'x': 'Category', 'y': 'Count'}
+    )
+
+
+def harmful_figure(cube, categories):
+    import plotly.express as px
+
+    harmful_counts = cube.totals('harmful_status', categories)
+    return px.pie(
+        values=harmful_counts.values,
+        names=harmful_counts.index,
+        title="Harmful vs Non-harmful Products",
+        hole=0.3
+    )
+
+
+def brands_figure(cube, categories):
+    import plotly.express as px
+
+    top_brands = _frame(cube.totals('brand', categories).head(10))
+    return px.bar(
+        top_brands,
+        x='x',
+        y='y',
+        title="Top 10 Brands by Product Count",
+        labels={'x': 'Brand', 'y': 'Number of Products'}
+    )
+
+
+BUILDERS = {
+    'category': category_figure,
+    'harmful': harmful_figure,
+    'brands': brands_figure,
+}
+
+
+class FigureCache:
+    def __init__(self, cube, max_bytes=32 * 1024 * 1024):
+        self.cube = cube
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        self._specs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def spec(self, kind, categories, theme, *options):
+        """Serialized figure for `kind` ('category', 'harmful' or 'brands')."""
+        key = (kind, tuple(categories), theme) + options
+        with self._lock:
+            spec = self._specs.get(key)
+            if spec is not None:
+                self.hits += 1
+                self._specs.move_to_end(key)
+                return spec
+            self.misses += 1
+        with metrics.timed("figure_build"):
+            fig = BUILDERS[kind](self.cube, list(categories), *options)
+            spec = themed(fig, theme).to_json()
+        with self._lock:
+            if key not in self._specs:
+                self._specs[key] = spec
+                self.size_bytes += len(spec)
+            while self.size_bytes > self.max_bytes and len(self._specs) > 1:
+                _, evicted = self._specs.popitem(last=False)
+                self.size_bytes -= len(evicted)
+                self.evictions += 1
+        return spec
+
+    def figure(self, kind, categories, theme, *options):
+        import plotly.io as pio
+
+        with metrics.timed("figure"):
+            return pio.from_json(self.spec(kind, categories, theme, *options))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._specs),
+            'size_bytes': self.size_bytes,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,107 @@
+"""Memoized filter pipeline for the Search page.
+
+Row ids are grouped per category and per harmful status once per dataset. A
+filter combination starts from the smallest applicable group (or the ranked
+search hits, or the products containing an ingredient) and narrows it with
+integer code comparisons. Results are kept in a bounded LRU keyed by the
+filter tuple, so repeated combinations never touch the full frame.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import metrics
+
+ALL = "All"
+
+
+class FilterPipeline:
+    def __init__(self, data, search_index, ingredients=None, cache_size=256):
+        self.search_index = search_index
+        self.ingredients = ingredients
+        self.n_rows = len(data)
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        # Streamlit sessions run on separate threads and share this pipeline
+        self._lock = threading.Lock()
+        self._codes = {}
+        self._groups = {}
+        self._masks = {}
+        for column in ("category", "harmful_status"):
+            values = data[column].astype("category")
+            codes = values.cat.codes.to_numpy()
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(values.cat.categories) + 1))
+            self._codes[column] = (codes, {value: i for i, value in enumerate(values.cat.categories)})
+            self._groups[column] = [order[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    def _conditions(self, category, harmful):
+        conditions = []
+        for column, value in (("category", category), ("harmful_status", harmful)):
+            if value != ALL:
+                codes, lookup = self._codes[column]
+                conditions.append((column, codes, lookup.get(value, -1)))
+        return conditions
+
+    def mask(self, column, value):
+        """Boolean mask over all rows of `column == value`, computed once."""
+        key = (column, value)
+        if key not in self._masks:
+            codes, lookup = self._codes[column]
+            mask = codes == lookup.get(value, -1)
+            mask.setflags(write=False)
+            self._masks[key] = mask
+        return self._masks[key]
+
+    def restrict(self, ids, category=ALL, harmful=ALL):
+        """Keep the ids (in order) that pass the category and harmful filters."""
+        keep = None
+        for _, codes, code in self._conditions(category, harmful):
+            matches = codes[ids] == code
+            keep = matches if keep is None else keep & matches
+        return ids if keep is None else ids[keep]
+
+    def _compute(self, category, harmful, query, ingredient):
+        if ingredient and self.ingredients is not None:
+            containing = self.ingredients.products_with(ingredient)
+            if query:
+                ranked = self.search_index.search(query)
+                containing = ranked[np.isin(ranked, containing)]
+            return self.restrict(containing, category, harmful)
+        if query:
+            return self.restrict(self.search_index.search(query), category, harmful)
+        conditions = self._conditions(category, harmful)
+        if not conditions:
+            return np.arange(self.n_rows)
+        # Start from the smallest group and check the remaining codes on it
+        groups = [
+            (self._groups[column][code] if code >= 0 else np.empty(0, dtype=np.int64), column)
+            for column, _, code in conditions
+        ]
+        ids, column = min(groups, key=lambda group: len(group[0]))
+        for other, codes, code in conditions:
+            if other != column:
+                ids = ids[codes[ids] == code]
+        return ids
+
+    def rows(self, category=ALL, harmful=ALL, query="", ingredient=""):
+        """Row ids matching the filters, ranked by the search index when querying."""
+        key = (category, harmful, " ".join(query.lower().split()), " ".join(ingredient.lower().split()))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return cached
+            self.misses += 1
+        with metrics.timed("filter"):
+            ids = np.asarray(self._compute(*key))
+        ids.setflags(write=False)
+        with self._lock:
+            self._cache[key] = ids
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return ids
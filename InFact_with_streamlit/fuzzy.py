@@ -0,0 +1,118 @@
+"""Typo-tolerant token lookup with a character-trigram index.
+
+Every token is padded ("$brocoli$") and cut into trigrams, and each trigram
+lists the tokens containing it. A misspelt query term is matched in two
+steps: tokens sharing enough of its trigrams are counted with one bincount
+over those lists (q-gram filter: k edits remove at most 4k trigrams), then
+only those candidates get the bounded edit distance, which stops as soon as
+the distance must exceed the limit. A transposition inside a four-letter term
+can leave it no trigram in common with the intended token; such typos are
+not found.
+"""
+import os
+
+import numpy as np
+
+MAX_CANDIDATES = 200
+
+
+def trigrams(token):
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(term):
+    """Edits tolerated for a term: none below 4 letters, 2 from 8 letters."""
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+def bounded_distance(a, b, limit):
+    """Edit distance counting adjacent transpositions as one edit, or
+    `limit + 1` as soon as it is certain to exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class TrigramIndex:
+    def __init__(self, tokens, grams, offsets, members):
+        # tokens: the indexed tokens; grams: sorted trigrams; the tokens
+        # containing grams[i] are tokens[members[offsets[i]:offsets[i + 1]]]
+        self.tokens = tokens
+        self.grams = grams
+        self.offsets = offsets
+        self.members = members
+        self.lengths = np.fromiter((len(token) for token in tokens), dtype=np.int32, count=len(tokens))
+        self.gram_counts = np.bincount(members, minlength=len(tokens)).astype(np.int32)
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        tokens = list(tokens)
+        pairs = sorted((gram, i) for i, token in enumerate(tokens) for gram in trigrams(token))
+        grams = np.array(sorted({gram for gram, _ in pairs}), dtype="<U3")
+        members = np.fromiter((i for _, i in pairs), dtype=np.int32, count=len(pairs))
+        starts = np.searchsorted(np.array([gram for gram, _ in pairs], dtype="<U3"), grams) if pairs else []
+        offsets = np.append(np.asarray(starts, dtype=np.int64), len(pairs))
+        return cls(tokens, grams, offsets, members)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "tokens.npy"), np.array(self.tokens, dtype=str))
+        for name in ("grams", "offsets", "members"):
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory):
+        return cls(*(
+            np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in ("tokens", "grams", "offsets", "members")
+        ))
+
+    def candidates(self, term, limit):
+        """Ids of tokens that can be within `limit` edits of `term`."""
+        grams = trigrams(term)
+        if not len(self.grams):
+            return np.empty(0, dtype=np.int64)
+        positions = np.searchsorted(self.grams, sorted(grams))
+        lists = [
+            self.members[self.offsets[p]:self.offsets[p + 1]]
+            for p, gram in zip(positions, sorted(grams))
+            if p < len(self.grams) and self.grams[p] == gram
+        ]
+        if not lists:
+            return np.empty(0, dtype=np.int64)
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.tokens))
+        # An edit removes at most 3 distinct trigrams from either side, a
+        # transposition 4; candidates must also share at least one
+        needed = np.maximum(self.gram_counts, len(grams)) - 4 * limit
+        keep = (shared > 0) & (shared >= needed) & (np.abs(self.lengths - len(term)) <= limit)
+        ids = np.flatnonzero(keep)
+        if len(ids) > MAX_CANDIDATES:
+            ids = ids[np.argsort(-shared[ids], kind="stable")[:MAX_CANDIDATES]]
+        return ids
+
+    def similar(self, term, limit=None):
+        """(token, distance) pairs within `limit` edits of `term`, closest first."""
+        limit = max_edits(term) if limit is None else limit
+        if limit <= 0:
+            return []
+        found = []
+        for i in self.candidates(term, limit):
+            token = str(self.tokens[i])
+            distance = bounded_distance(term, token, limit)
+            if distance <= limit:
+                found.append((token, distance))
+        return sorted(found, key=lambda item: (item[1], item[0]))
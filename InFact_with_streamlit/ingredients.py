@@ -0,0 +1,183 @@
+"""Structured parsing of the free-text "Ingredient Details" column.
+
+Each product's ingredient text is split into canonical ingredient names with
+their nesting depth, e.g.
+
+    "Potato Bites (Potatoes, Seasoning Blend (Salt, Onion Powder))"
+    -> potato bites/0, potatoes/1, seasoning blend/1, salt/2, onion powder/2
+
+and the catalogue is exploded into a product -> ingredient table of integer
+ids. An inverted ingredient -> products index turns questions such as "all
+products containing palm oil" into lookups instead of substring scans.
+"""
+import json
+import os
+import re
+
+import numpy as np
+
+SPLIT_RE = re.compile(r"([,;()\[\]])")
+PERCENT_RE = re.compile(r"\d+(?:\.\d+)?\s*%\*?")
+# Hyphens in the source data were mangled into "N/A" ("NatureN/AIdentical")
+MANGLED_HYPHEN_RE = re.compile(r"(?<=\w)n/a(?=\w)")
+ROMAN_RE = re.compile(r"^[ivx]+$")
+SPACE_RE = re.compile(r"\s+")
+EMPTY_VALUES = {"", "n/a", "nan"}
+
+
+def canonical_name(text):
+    name = PERCENT_RE.sub(" ", text.lower())
+    name = MANGLED_HYPHEN_RE.sub("-", name)
+    # "less than 2% of: dextrin", "emulsifier: lecithin" -> the part after the colon
+    name = name.rsplit(":", 1)[-1]
+    name = SPACE_RE.sub(" ", name).strip(" .*-&")
+    if name.startswith("and "):
+        name = name[4:]
+    if name in EMPTY_VALUES or ROMAN_RE.match(name):
+        return ""
+    return name
+
+
+def parse_ingredients(text):
+    """(canonical name, depth) pairs in order, each name once at its lowest depth."""
+    depth = 0
+    current = []
+    found = {}
+
+    def flush():
+        name = canonical_name("".join(current))
+        current.clear()
+        if name and (name not in found or depth < found[name]):
+            found[name] = depth
+
+    for part in SPLIT_RE.split(str(text)):
+        if part in (",", ";"):
+            flush()
+        elif part in ("(", "["):
+            flush()
+            depth += 1
+        elif part in (")", "]"):
+            flush()
+            depth = max(depth - 1, 0)
+        else:
+            current.append(part)
+    flush()
+    return list(found.items())
+
+
+class IngredientParser:
+    """parse_ingredients() memoized per distinct text, so reparsing a changed
+    catalogue only parses the texts that were not seen before."""
+
+    def __init__(self):
+        self._parsed = {}
+
+    def __call__(self, text):
+        parsed = self._parsed.get(text)
+        if parsed is None:
+            parsed = self._parsed[text] = parse_ingredients(text)
+        return parsed
+
+    def retain(self, texts):
+        """Forget every parsed text not in `texts`."""
+        keep = set(texts)
+        self._parsed = {text: parsed for text, parsed in self._parsed.items() if text in keep}
+
+
+TABLE_ARRAYS = ("product_ids", "ingredient_ids", "depths", "products_by_ingredient", "offsets")
+
+
+class IngredientTable:
+    def __init__(self, vocabulary, product_ids, ingredient_ids, depths, n_products, by_ingredient=None):
+        self.vocabulary = vocabulary
+        self.ids = {name: i for i, name in enumerate(vocabulary)}
+        # Product -> ingredient rows, grouped by product
+        self.product_ids = product_ids
+        self.ingredient_ids = ingredient_ids
+        self.depths = depths
+        self.n_products = n_products
+        # Ingredient -> products: product ids grouped by ingredient, with offsets
+        if by_ingredient is None:
+            order = np.argsort(ingredient_ids, kind="stable")
+            by_ingredient = product_ids[order], np.searchsorted(ingredient_ids[order], np.arange(len(vocabulary) + 1))
+        self._products_by_ingredient, self._offsets = by_ingredient
+        # Word -> ingredient ids, for multi-word ingredient lookups
+        self._by_word = {}
+        for i, name in enumerate(vocabulary):
+            for word in name.split():
+                self._by_word.setdefault(word, set()).add(i)
+
+    @classmethod
+    def from_texts(cls, texts, parser=None):
+        parser = parser or IngredientParser()
+        ids = {}
+        product_ids, ingredient_ids, depths = [], [], []
+        for product_id, text in enumerate(texts):
+            for name, depth in parser(text):
+                product_ids.append(product_id)
+                ingredient_ids.append(ids.setdefault(name, len(ids)))
+                depths.append(depth)
+        return cls(
+            list(ids),
+            np.asarray(product_ids, dtype=np.int32),
+            np.asarray(ingredient_ids, dtype=np.int32),
+            np.asarray(depths, dtype=np.uint8),
+            len(texts),
+        )
+
+    @classmethod
+    def from_frame(cls, data, parser=None):
+        return cls.from_texts(data['ingredient_details'].tolist(), parser)
+
+    def save(self, directory):
+        """Write the table as .npy arrays that load() memory-maps."""
+        os.makedirs(directory, exist_ok=True)
+        arrays = (self.product_ids, self.ingredient_ids, self.depths, self._products_by_ingredient, self._offsets)
+        for name, array in zip(TABLE_ARRAYS, arrays):
+            np.save(os.path.join(directory, f"{name}.npy"), array)
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"vocabulary": list(self.vocabulary), "n_products": self.n_products}, f)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        product_ids, ingredient_ids, depths, by_ingredient, offsets = (
+            np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in TABLE_ARRAYS
+        )
+        return cls(
+            meta["vocabulary"], product_ids, ingredient_ids, depths, meta["n_products"],
+            by_ingredient=(by_ingredient, offsets),
+        )
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def products_with_id(self, ingredient_id):
+        lo, hi = self._offsets[ingredient_id], self._offsets[ingredient_id + 1]
+        return self._products_by_ingredient[lo:hi]
+
+    def matching_ids(self, name):
+        """Ids of the ingredients whose name contains `name` as whole words,
+        e.g. "palm oil" matches "palm oil" and "refined palm oil"."""
+        words = canonical_name(name).split()
+        if not words:
+            return []
+        candidates = set.intersection(*(self._by_word.get(word, set()) for word in words))
+        phrase = " ".join(words)
+        return sorted(i for i in candidates if f" {phrase} " in f" {self.vocabulary[i]} ")
+
+    def products_with(self, name):
+        """Sorted ids of products containing ingredient `name`."""
+        arrays = [self.products_with_id(i) for i in self.matching_ids(name)]
+        if not arrays:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(arrays)).astype(np.int64)
+
+    def ingredients_of(self, product_id):
+        """(name, depth) pairs of one product, in parse order."""
+        lo, hi = np.searchsorted(self.product_ids, [product_id, product_id + 1])
+        return [
+            (self.vocabulary[i], int(d))
+            for i, d in zip(self.ingredient_ids[lo:hi], self.depths[lo:hi])
+        ]
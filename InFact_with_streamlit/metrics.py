@@ -0,0 +1,219 @@
+"""Stage timings, cache hit rates and memory, for the app and the API.
+
+    with metrics.timed("search"):
+        ...
+
+Timings are only taken when INFACT_METRICS=1. Otherwise `timed` hands back
+one shared no-op context manager, so an instrumented block costs a function
+call and a flag check. Each stage keeps its last SAMPLES durations, from
+which p50/p95 are reported. Caches are read when a report is built: anything
+with `hits` and `misses` (FilterPipeline, FigureCache, an lru_cache's
+cache_info()) can be passed in, and code without its own counters can call
+`count(name, hit)`.
+
+report() is plain JSON; prometheus() renders the same numbers in the
+Prometheus text format. Profile captures one block with cProfile, or with
+pyinstrument when it is installed.
+"""
+import cProfile
+import importlib.util
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+import config
+
+SAMPLES = 1000
+
+_NOOP = nullcontext()
+
+
+class _Timer:
+    __slots__ = ("timings", "stage", "started")
+
+    def __init__(self, timings, stage):
+        self.timings = timings
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.record(self.stage, time.perf_counter() - self.started)
+
+
+class Timings:
+    def __init__(self, enabled=None, samples=SAMPLES):
+        self.enabled = config.METRICS if enabled is None else enabled
+        self.samples = samples
+        self._durations = {}
+        self._totals = {}
+        self._counters = {}
+        # Sessions, the reload watcher and Lottie fetches record from their own threads
+        self._lock = threading.Lock()
+
+    def timed(self, stage):
+        if not self.enabled:
+            return _NOOP
+        return _Timer(self, stage)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            durations = self._durations.get(stage)
+            if durations is None:
+                durations = self._durations[stage] = deque(maxlen=self.samples)
+            durations.append(seconds)
+            count, total = self._totals.get(stage, (0, 0.0))
+            self._totals[stage] = (count + 1, total + seconds)
+
+    def count(self, cache, hit):
+        if not self.enabled:
+            return
+        with self._lock:
+            hits, misses = self._counters.get(cache, (0, 0))
+            self._counters[cache] = (hits + 1, misses) if hit else (hits, misses + 1)
+
+    def stages(self):
+        """{stage: count, sum, p50/p95/max over the recent samples}, in seconds."""
+        with self._lock:
+            recent = {stage: np.array(durations) for stage, durations in self._durations.items()}
+            totals = dict(self._totals)
+        return {
+            stage: {
+                "count": totals[stage][0],
+                "sum": totals[stage][1],
+                "p50": float(np.percentile(durations, 50)),
+                "p95": float(np.percentile(durations, 95)),
+                "max": float(durations.max()),
+            }
+            for stage, durations in sorted(recent.items())
+        }
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+
+TIMINGS = Timings()
+timed = TIMINGS.timed
+count = TIMINGS.count
+
+
+def memory():
+    """Resident and peak memory of this process, in bytes."""
+    usage = {}
+    try:
+        with open("/proc/self/statm") as f:
+            usage["rss"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return usage
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    usage["peak_rss"] = peak if sys.platform == "darwin" else peak * 1024
+    return usage
+
+
+def report(caches=None, sizes=None, timings=TIMINGS):
+    """JSON-ready metrics. `caches` maps names to objects with hits and misses;
+    `sizes` maps names to byte counts reported next to process memory."""
+    counters = timings.counters()
+    for name, cache in (caches or {}).items():
+        counters[name] = (cache.hits, cache.misses)
+    return {
+        "enabled": timings.enabled,
+        "stages": timings.stages(),
+        "caches": {
+            name: {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+            for name, (hits, misses) in sorted(counters.items())
+        },
+        "memory": dict(memory(), **(sizes or {})),
+    }
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus(result):
+    """A report() result in the Prometheus text exposition format."""
+    lines = [
+        "# HELP infact_stage_seconds Duration of instrumented stages (quantiles over recent samples).",
+        "# TYPE infact_stage_seconds summary",
+    ]
+    for stage, stats in result["stages"].items():
+        stage = _label(stage)
+        lines += [
+            f'infact_stage_seconds{{stage="{stage}",quantile="0.5"}} {stats["p50"]:.6g}',
+            f'infact_stage_seconds{{stage="{stage}",quantile="0.95"}} {stats["p95"]:.6g}',
+            f'infact_stage_seconds_sum{{stage="{stage}"}} {stats["sum"]:.6g}',
+            f'infact_stage_seconds_count{{stage="{stage}"}} {stats["count"]}',
+        ]
+    for kind in ("hits", "misses"):
+        lines += [
+            f"# HELP infact_cache_{kind}_total Cache {kind} since the process started.",
+            f"# TYPE infact_cache_{kind}_total counter",
+        ]
+        lines += [
+            f'infact_cache_{kind}_total{{cache="{_label(name)}"}} {stats[kind]}'
+            for name, stats in result["caches"].items()
+        ]
+    lines += ["# HELP infact_memory_bytes Process and data structure memory.", "# TYPE infact_memory_bytes gauge"]
+    lines += [f'infact_memory_bytes{{kind="{_label(kind)}"}} {value}' for kind, value in result["memory"].items()]
+    return "\n".join(lines) + "\n"
+
+
+class Profile:
+    """Profile of one block, as text: pyinstrument's call tree when it is
+    installed and asked for, otherwise cProfile's top functions."""
+
+    def __init__(self, pyinstrument=False, limit=40):
+        self.pyinstrument = pyinstrument and importlib.util.find_spec("pyinstrument") is not None
+        self.limit = limit
+        self.text = ""
+        self._profiler = None
+
+    def start(self):
+        if self.pyinstrument:
+            from pyinstrument import Profiler
+
+            self._profiler = Profiler()
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def stop(self):
+        if self.pyinstrument:
+            self._profiler.stop()
+            self.text = self._profiler.output_text(unicode=True)
+        else:
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(self.limit)
+            self.text = out.getvalue()
+        return self.text
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
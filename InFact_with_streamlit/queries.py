@@ -0,0 +1,210 @@
+"""Read-only catalogue queries, independent of Streamlit.
+
+CatalogueQueries answers everything the app pages and the HTTP API (api.py)
+ask of one catalogue snapshot: filtered and ranked search (correcting typos
+when nothing matches as typed), product detail, similar and safer
+alternatives, risk breakdowns and aggregate counts. Row ids come from the
+snapshot's indexes and are only valid for that snapshot, which is why JSON
+results carry its id as "version".
+"""
+import numpy as np
+import pandas as pd
+
+from cards import PAGE_SIZE, page_count, page_slice
+from filters import ALL
+
+# Columns of a search result; product detail returns every column
+SUMMARY_FIELDS = (
+    "product_name", "brand", "category", "is_harmful?", "harmful_status",
+    "total_ingredients", "harmful_ingredient_count",
+)
+
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+class CatalogueQueries:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.data = snapshot.data
+        self.filters = snapshot.filter_pipeline
+        self.scorer = snapshot.harmful_scorer
+        self.cube = snapshot.analytics_cube
+        self._safe = None
+        self._name_codes = None
+        self._getters = {}
+        self._stats = {}
+        self._fuzzy = {}
+
+    @property
+    def version(self):
+        return self.snapshot.id
+
+    @property
+    def categories(self):
+        return self.cube.categories
+
+    @property
+    def safe_mask(self):
+        """Rows whose harmful status is "No"."""
+        if self._safe is None:
+            self._safe = self.filters.mask("harmful_status", "No")
+        return self._safe
+
+    @property
+    def name_codes(self):
+        """One integer per distinct product name, so comparing names costs no
+        string work (and no copy of an Arrow-backed column per call)."""
+        if self._name_codes is None:
+            self._name_codes = pd.factorize(self.data["product_name"])[0]
+        return self._name_codes
+
+    def __len__(self):
+        return len(self.data)
+
+    def search(self, query="", category=ALL, harmful=ALL, ingredient=""):
+        """Row ids matching the filters, ranked by the search index when querying."""
+        return self.filters.rows(category, harmful, query, ingredient)
+
+    def fuzzy_search(self, query, category=ALL, harmful=ALL, ingredient=""):
+        """(row ids, {typed term: correction}) for a query with misspelt terms.
+
+        Only worth asking once the exact search found nothing; ids are ranked
+        by how few edits they needed.
+        """
+        key = (" ".join(query.lower().split()), category, harmful, " ".join(ingredient.lower().split()))
+        cached = self._fuzzy.get(key)
+        if cached is not None:
+            return cached
+        ids, corrections = self.snapshot.search_index.fuzzy_search(key[0])
+        if len(ids) and ingredient:
+            ingredients = self.snapshot.ingredient_table
+            ids = ids[np.isin(ids, ingredients.products_with(ingredient))]
+        result = self.filters.restrict(ids, category, harmful), corrections
+        if len(self._fuzzy) >= 256:
+            self._fuzzy.clear()
+        self._fuzzy[key] = result
+        return result
+
+    def suggestions(self, query, category=ALL, harmful=ALL, limit=3):
+        """Products matching any query term, for searches that found nothing."""
+        return self.filters.restrict(self.snapshot.search_index.search_any(query), category, harmful)[:limit]
+
+    def similar(self, row_id, allowed=None, limit=3):
+        """Catalogue neighbours of a product, skipping repeats of its own name."""
+        ids, _ = self.snapshot.similarity_model.top_k(row_id, k=limit * 3, allowed=allowed)
+        names = self.name_codes
+        ids = ids[names[ids] != names[row_id]]
+        _, first = np.unique(names[ids], return_index=True)
+        return ids[np.sort(first)][:limit]
+
+    def safer(self, row_id, limit=3):
+        """Similar products marked safe; none for a product that already is."""
+        if self.safe_mask[row_id]:
+            return EMPTY
+        return self.similar(row_id, allowed=self.safe_mask, limit=limit)
+
+    def risk(self, row_id):
+        """Rules-based risk score and its (ingredient, weight, reason) contributions."""
+        return float(self.scorer.scores[row_id]), self.scorer.contributions(row_id)
+
+    def harmful_counts(self, categories=None):
+        return self.cube.totals("harmful_status", categories)
+
+    # JSON-ready results
+
+    def _getter(self, field):
+        # Plain Python values of one column at given row ids, without building
+        # a DataFrame per request; categoricals index their labels by code
+        getter = self._getters.get(field)
+        if getter is None:
+            values = self.data[field]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                labels = np.asarray([str(label) for label in values.cat.categories], dtype=object)
+                codes = values.cat.codes.to_numpy()
+                getter = lambda ids: labels[codes[ids]].tolist()
+            elif isinstance(values.dtype, np.dtype):
+                array = values.to_numpy()
+                getter = lambda ids: array[ids].tolist()
+            else:
+                array = values.array
+                getter = lambda ids: array.take(ids).tolist()
+            self._getters[field] = getter
+        return getter
+
+    def records(self, ids, fields=SUMMARY_FIELDS):
+        """One dict per row id with its `id` and the given columns."""
+        ids = np.asarray(ids, dtype=np.int64)
+        columns = [self._getter(field)(ids) for field in fields]
+        return [dict(zip(fields, values), id=row_id) for row_id, values in zip(ids.tolist(), zip(*columns))]
+
+    def search_page(self, query="", category=ALL, harmful=ALL, ingredient="", page=1, page_size=PAGE_SIZE):
+        ids = self.search(query, category, harmful, ingredient)
+        corrections = {}
+        if not len(ids) and query:
+            ids, corrections = self.fuzzy_search(query, category, harmful, ingredient)
+        rows = page_slice(len(ids), page, page_size)
+        result = {
+            "version": self.version,
+            "total": len(ids),
+            "page": rows.start // page_size + 1,
+            "pages": page_count(len(ids), page_size),
+            "results": self.records(ids[rows]),
+        }
+        if corrections:
+            result["corrections"] = corrections
+        if not len(ids) and query:
+            result["suggestions"] = self.records(self.suggestions(query, category, harmful))
+        return result
+
+    def check_id(self, row_id):
+        row_id = int(row_id)
+        if not 0 <= row_id < len(self.data):
+            raise KeyError(row_id)
+        return row_id
+
+    def product(self, row_id):
+        row_id = self.check_id(row_id)
+        score, contributions = self.risk(row_id)
+        detail = self.records([row_id], tuple(self.data.columns))[0]
+        detail.update(
+            version=self.version,
+            risk_score=score,
+            risk_contributions=[
+                {"ingredient": name, "weight": weight, "reason": reason}
+                for name, weight, reason in contributions
+            ],
+            ingredients=[name for name, _ in self.snapshot.ingredient_table.ingredients_of(row_id)],
+        )
+        return detail
+
+    def alternatives(self, row_id, limit=3):
+        row_id = self.check_id(row_id)
+        return {
+            "version": self.version,
+            "id": row_id,
+            "similar": self.records(self.similar(row_id, limit=limit)),
+            "safer": self.records(self.safer(row_id, limit=limit)),
+        }
+
+    def stats(self, categories=None, top_brands=10):
+        # The snapshot never changes, so each selection is computed once
+        key = (None if categories is None else tuple(categories), top_brands)
+        cached = self._stats.get(key)
+        if cached is not None:
+            return cached
+
+        def counts(totals):
+            return {str(label): int(count) for label, count in totals.items()}
+
+        by_category = self.cube.totals("category", categories)
+        result = {
+            "version": self.version,
+            "products": int(by_category.sum()),
+            "harmful_status": counts(self.harmful_counts(categories)),
+            "categories": counts(by_category),
+            "top_brands": counts(self.cube.totals("brand", categories).head(top_brands)),
+        }
+        if len(self._stats) >= 256:
+            self._stats.clear()
+        self._stats[key] = result
+        return result
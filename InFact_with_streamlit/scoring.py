@@ -0,0 +1,97 @@
+"""Harmful-ingredient scoring from a rules dictionary.
+
+Rules map an ingredient pattern to a severity weight, e.g.
+
+    {"palm oil": {"weight": 1.5, "reason": "High in saturated fat"}}
+
+A pattern matches every parsed ingredient containing it as whole words
+("palm oil" also matches "refined palm oil"), or only the identical name when
+the rule sets "exact": true. Matching runs over the ingredient vocabulary, and
+the whole catalogue is scored with one sparse product of the product x
+ingredient incidence matrix and the per-ingredient weight vector. Editing the
+rules therefore only re-matches the vocabulary and redoes that product.
+"""
+import json
+import os
+
+import numpy as np
+import scipy.sparse as sp
+
+import config
+
+
+def load_rules(path=None):
+    with open(path or config.RULES_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class HarmfulScorer:
+    def __init__(self, ingredients, rules=None, matrix=None):
+        self.ingredients = ingredients
+        if matrix is None:
+            # Product x ingredient incidence matrix (one entry per parsed ingredient)
+            matrix = sp.csr_matrix(
+                (
+                    np.ones(len(ingredients.product_ids), dtype=np.float32),
+                    (ingredients.product_ids, ingredients.ingredient_ids),
+                ),
+                shape=(ingredients.n_products, len(ingredients.vocabulary)),
+            )
+            matrix.sum_duplicates()
+        self.matrix = matrix
+        self.set_rules(load_rules() if rules is None else rules)
+
+    def set_rules(self, rules):
+        """Re-match `rules` against the vocabulary and rescore every product."""
+        self.rules = dict(rules)
+        self.patterns = list(self.rules)
+        n_ingredients = len(self.ingredients.vocabulary)
+        weights = np.zeros(n_ingredients, dtype=np.float32)
+        # Index into self.patterns of the rule setting each ingredient's weight
+        self.rule_of = np.full(n_ingredients, -1, dtype=np.int32)
+        for rule_id, pattern in enumerate(self.patterns):
+            rule = self.rules[pattern]
+            weight = float(rule.get("weight", 1.0))
+            if rule.get("exact"):
+                matched = self.ingredients.ids.get(pattern.lower().strip())
+                matched = [] if matched is None else [matched]
+            else:
+                matched = self.ingredients.matching_ids(pattern)
+            for ingredient_id in matched:
+                # An ingredient matched by several rules takes the most severe one
+                if weight > weights[ingredient_id]:
+                    weights[ingredient_id] = weight
+                    self.rule_of[ingredient_id] = rule_id
+        self.weights = weights
+        self.scores = self.matrix @ weights
+        return self.scores
+
+    def save(self, directory):
+        """Write the rules and incidence matrix; load() memory-maps the matrix."""
+        os.makedirs(directory, exist_ok=True)
+        for part in ("data", "indices", "indptr"):
+            np.save(os.path.join(directory, f"matrix.{part}.npy"), getattr(self.matrix, part))
+        with open(os.path.join(directory, "rules.json"), "w", encoding="utf-8") as f:
+            json.dump(self.rules, f)
+
+    @classmethod
+    def load(cls, directory, ingredients):
+        parts = [
+            np.load(os.path.join(directory, f"matrix.{part}.npy"), mmap_mode="r")
+            for part in ("data", "indices", "indptr")
+        ]
+        matrix = sp.csr_matrix(
+            tuple(parts), shape=(ingredients.n_products, len(ingredients.vocabulary)), copy=False
+        )
+        return cls(ingredients, load_rules(os.path.join(directory, "rules.json")), matrix)
+
+    def contributions(self, product_id):
+        """(ingredient, weight, reason) for each flagged ingredient, largest first."""
+        row = self.matrix[product_id]
+        found = []
+        for ingredient_id in row.indices:
+            weight = self.weights[ingredient_id]
+            if weight > 0:
+                rule = self.rules[self.patterns[self.rule_of[ingredient_id]]]
+                found.append((self.ingredients.vocabulary[ingredient_id], float(weight), rule.get("reason", "")))
+        return sorted(found, key=lambda item: -item[1])
@@ -0,0 +1,296 @@
+"""Inverted index over product names, brands and ingredients.
+
+The index is built once per dataset and answers prefix/substring queries by
+walking a sorted table of token suffixes, so a lookup only touches the tokens
+and rows that actually match instead of scanning the whole catalogue.
+Product name and brand tokens are also trigram-indexed (see fuzzy.py), so a
+misspelt query can fall back to the closest tokens.
+"""
+import json
+import os
+import re
+from bisect import bisect_left
+from collections.abc import Mapping
+
+import numpy as np
+
+from fuzzy import TrigramIndex
+
+# Words may be joined by "&" or an apostrophe ("m&m's", "lay's"); apostrophes
+# are then dropped, so "lay's" and "lays" are one token
+TOKEN_RE = re.compile(r"[^\W_]+(?:['’&][^\W_]+)*")
+APOSTROPHES = str.maketrans("", "", "'’")
+# Shorter terms are a substring of nearly every token, so they only match the
+# token they spell
+MIN_SUBSTRING = 2
+
+# Field order doubles as ranking: product name hits are listed before brand
+# hits, which are listed before ingredient hits
+SEARCH_FIELDS = ("product_name", "brand", "ingredient_details")
+FUZZY_FIELDS = ("product_name", "brand")
+
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+def tokenize(text):
+    return [token.translate(APOSTROPHES) for token in TOKEN_RE.findall(str(text).lower())]
+
+
+class PackedPostings(Mapping):
+    """Read-only token -> row ids mapping over flat (memory-mapped) arrays:
+    the rows of vocabulary[i] are rows[offsets[i]:offsets[i + 1]]."""
+
+    def __init__(self, vocabulary, offsets, rows):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.rows = rows
+
+    def _position(self, token):
+        i = int(np.searchsorted(self.vocabulary, token))
+        if i < len(self.vocabulary) and self.vocabulary[i] == token and self.offsets[i + 1] > self.offsets[i]:
+            return i
+        return -1
+
+    def __getitem__(self, token):
+        i = self._position(token)
+        if i < 0:
+            raise KeyError(token)
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def __contains__(self, token):
+        return self._position(token) >= 0
+
+    def __iter__(self):
+        lengths = np.diff(self.offsets)
+        return (str(token) for token, n in zip(self.vocabulary, lengths) if n)
+
+    def __len__(self):
+        return int(np.count_nonzero(np.diff(self.offsets)))
+
+
+class SearchIndex:
+    def __init__(self):
+        self.n_rows = 0
+        # field -> token -> row ids (lists while building, arrays once finalized)
+        self._postings = {field: {} for field in SEARCH_FIELDS}
+        # Sorted tokens, and every token suffix with the id of its token
+        self._vocabulary = []
+        self._suffixes = []
+        self._suffix_ids = []
+        self.fuzzy = TrigramIndex.from_tokens([])
+
+    @classmethod
+    def from_frame(cls, data):
+        index = cls()
+        index.add_rows(data)
+        index.finalize()
+        return index
+
+    def add_rows(self, frame, offset=None):
+        """Index a batch of rows; row ids are positions starting at `offset`."""
+        if offset is None:
+            offset = self.n_rows
+        for field in SEARCH_FIELDS:
+            if field not in frame.columns:
+                continue
+            postings = self._postings[field]
+            for row_id, text in enumerate(frame[field].tolist(), start=offset):
+                for token in set(tokenize(text)):
+                    postings.setdefault(token, []).append(row_id)
+        self.n_rows = max(self.n_rows, offset + len(frame))
+
+    def updated(self, remap, frame):
+        """A new index with this one's row ids mapped through `remap` (-1 drops
+        a row) and the rows of `frame` appended after the kept ones.
+
+        Only the appended rows are tokenized; this index is left untouched.
+        """
+        index = type(self)()
+        for field, postings in self._postings.items():
+            target = index._postings[field]
+            for token, rows in postings.items():
+                rows = remap[rows]
+                rows = rows[rows >= 0]
+                if len(rows):
+                    target[token] = rows.tolist()
+        index.n_rows = int((remap >= 0).sum())
+        index.add_rows(frame)
+        vocabulary = set().union(*(index._postings[field] for field in SEARCH_FIELDS))
+        if vocabulary == set(self._vocabulary):
+            # Same tokens: share the suffix table instead of re-sorting it
+            index._finalize_postings()
+            index._vocabulary = self._vocabulary
+            index._suffixes = self._suffixes
+            index._suffix_ids = self._suffix_ids
+            index.fuzzy = self.fuzzy
+            return index
+        return index.finalize()
+
+    def _finalize_postings(self):
+        for postings in self._postings.values():
+            for token, rows in postings.items():
+                postings[token] = np.unique(np.asarray(rows, dtype=np.int64))
+
+    def finalize(self):
+        self._finalize_postings()
+        self._vocabulary = sorted(set().union(*self._postings.values()))
+        # Every suffix of every token, sorted, so that "tokens containing q" is a
+        # prefix range lookup on this table
+        pairs = sorted(
+            (token[start:], token_id)
+            for token_id, token in enumerate(self._vocabulary)
+            for start in range(len(token))
+        )
+        self._suffixes = [suffix for suffix, _ in pairs]
+        self._suffix_ids = [token_id for _, token_id in pairs]
+        self.fuzzy = TrigramIndex.from_tokens(sorted(set().union(*(self._postings[field] for field in FUZZY_FIELDS))))
+        return self
+
+    def save(self, directory):
+        """Write the finalized index as flat .npy arrays that load() memory-maps."""
+        os.makedirs(directory, exist_ok=True)
+        vocabulary = np.array(self._vocabulary, dtype=str)
+        np.save(os.path.join(directory, "vocabulary.npy"), vocabulary)
+        np.save(os.path.join(directory, "suffixes.npy"), np.array(self._suffixes, dtype=str))
+        np.save(os.path.join(directory, "suffix_ids.npy"), np.asarray(self._suffix_ids, dtype=np.int32))
+        for field, postings in self._postings.items():
+            arrays = [postings.get(token, EMPTY) for token in self._vocabulary]
+            offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+            np.cumsum([len(rows) for rows in arrays], out=offsets[1:])
+            rows = np.concatenate(arrays) if arrays else EMPTY
+            np.save(os.path.join(directory, f"{field}.offsets.npy"), offsets)
+            np.save(os.path.join(directory, f"{field}.rows.npy"), rows.astype(np.int64))
+        self.fuzzy.save(os.path.join(directory, "fuzzy"))
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"n_rows": self.n_rows}, f)
+
+    @classmethod
+    def load(cls, directory):
+        """A read-only index over memory-mapped arrays written by save()."""
+        def array(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+        index = cls()
+        with open(os.path.join(directory, "meta.json")) as f:
+            index.n_rows = json.load(f)["n_rows"]
+        index._vocabulary = array("vocabulary")
+        index._suffixes = array("suffixes")
+        index._suffix_ids = array("suffix_ids")
+        index._postings = {
+            field: PackedPostings(index._vocabulary, array(f"{field}.offsets"), array(f"{field}.rows"))
+            for field in SEARCH_FIELDS
+        }
+        index.fuzzy = TrigramIndex.load(os.path.join(directory, "fuzzy"))
+        return index
+
+    def matching_tokens(self, term, prefix_only=False):
+        """Tokens that contain `term` (or start with it when `prefix_only`)."""
+        term = term.lower()
+        if len(term) < MIN_SUBSTRING:
+            i = bisect_left(self._vocabulary, term)
+            return {term} if i < len(self._vocabulary) and self._vocabulary[i] == term else set()
+        tokens = set()
+        start = bisect_left(self._suffixes, term)
+        for pos in range(start, len(self._suffixes)):
+            suffix = self._suffixes[pos]
+            if not suffix.startswith(term):
+                break
+            token = str(self._vocabulary[self._suffix_ids[pos]])
+            if not prefix_only or len(suffix) == len(token):
+                tokens.add(token)
+        return tokens
+
+    def _union(self, arrays):
+        """Sorted union of row id arrays."""
+        arrays = [rows for rows in arrays if len(rows)]
+        if not arrays:
+            return EMPTY
+        if len(arrays) == 1:
+            return arrays[0]
+        if sum(len(rows) for rows in arrays) * 16 < self.n_rows:
+            rows = np.sort(np.concatenate(arrays))
+            return rows[np.concatenate(([True], rows[1:] != rows[:-1]))]
+        # Large unions: marking rows beats sorting the concatenation
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for rows in arrays:
+            mask[rows] = True
+        return np.flatnonzero(mask)
+
+    def _term_rows(self, tokens, field):
+        postings = self._postings[field]
+        return self._union([postings[token] for token in tokens if token in postings])
+
+    def _all_terms(self, term_rows, fields):
+        result = None
+        for rows_by_field in term_rows:
+            rows = self._union([rows_by_field[field] for field in fields])
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if not len(result):
+                break
+        return EMPTY if result is None else result
+
+    def search(self, query, fields=SEARCH_FIELDS):
+        """Row ids matching every query term, ranked by the field they hit."""
+        return self._ranked([self.matching_tokens(term) for term in tokenize(query)], fields)
+
+    def _ranked(self, term_tokens, fields):
+        if not term_tokens:
+            return EMPTY
+        # Rows of every term in every field, looked up once
+        term_rows = [{field: self._term_rows(tokens, field) for field in fields} for tokens in term_tokens]
+        ranked = []
+        seen = EMPTY
+        # One pass per field, then rows whose terms are spread across fields
+        for group in [(field,) for field in fields] + [tuple(fields)]:
+            rows = self._all_terms(term_rows, group)
+            if len(seen):
+                rows = rows[~np.isin(rows, seen, assume_unique=True)]
+            if len(rows):
+                ranked.append(rows)
+                seen = np.union1d(seen, rows)
+        return np.concatenate(ranked) if ranked else EMPTY
+
+    def fuzzy_search(self, query, fields=FUZZY_FIELDS):
+        """Rows matching every query term, misspelt terms replaced by the
+        tokens within a few edits of them; fewest total edits first, then by
+        the field they hit.
+
+        Returns (row ids, {misspelt term: closest token}); no corrections means
+        there was nothing to correct and the result is empty.
+        """
+        term_tokens, corrections = [], {}
+        for term in tokenize(query):
+            exact = self.matching_tokens(term)
+            if exact:
+                term_tokens.append(dict.fromkeys(exact, 0))
+                continue
+            similar = self.fuzzy.similar(term)
+            if not similar:
+                return EMPTY, {}
+            term_tokens.append(dict(similar))
+            corrections[term] = similar[0][0]
+        if not corrections:
+            return EMPTY, {}
+        ids = self._ranked(term_tokens, fields)
+        edits = np.zeros(len(ids), dtype=np.int64)
+        for distances in term_tokens:
+            # Each row counts the closest of its tokens for this term
+            best = np.full(len(ids), max(distances.values()), dtype=np.int64)
+            for distance in sorted(set(distances.values()))[:-1]:
+                tokens = [token for token, d in distances.items() if d == distance]
+                rows = self._union([self._term_rows(tokens, field) for field in fields])
+                best = np.where(np.isin(ids, rows) & (best > distance), distance, best)
+            edits += best
+        return ids[np.argsort(edits, kind="stable")], corrections
+
+    def search_any(self, query, fields=("product_name",)):
+        """Row ids matching at least one query term, used for suggestions."""
+        arrays = [
+            self._term_rows(self.matching_tokens(term), field)
+            for term in tokenize(query)
+            for field in fields
+        ]
+        arrays = [rows for rows in arrays if len(rows)]
+        if not arrays:
+            return EMPTY
+        return np.unique(np.concatenate(arrays))
@@ -0,0 +1,147 @@
+"""TF-IDF product similarity over ingredient text.
+
+The fitted matrix stays sparse and resident. Neighbours are found by walking
+the term -> product postings of one product's terms, so the cost of a query
+depends on how many products share its terms, never on an N x N matrix.
+When an LSH index is attached (see ann_index.py) only the products in the
+query's buckets are reranked.
+"""
+import hashlib
+import os
+
+import numpy as np
+import scipy.sparse as sp
+
+import config
+
+SIMILARITY_FIELDS = ("ingredient_details", "ingredient_types", "category")
+
+
+def product_documents(frame):
+    documents = None
+    for field in SIMILARITY_FIELDS:
+        if field not in frame.columns:
+            continue
+        text = frame[field].astype(str).replace("N/A", "")
+        documents = text if documents is None else documents + " " + text
+    return documents.tolist()
+
+
+class SimilarityModel:
+    def __init__(self, vectorizer, matrix, stale_rows=0, by_term=None):
+        self.vectorizer = vectorizer
+        # Rows transformed with an older fit's vocabulary and IDF weights
+        self.stale_rows = stale_rows
+        # Rows are L2-normalised, so a dot product is the cosine similarity
+        self.matrix = matrix.tocsr()
+        # Term -> product postings (the transpose) for neighbour lookups
+        self._by_term = self.matrix.T.tocsr() if by_term is None else by_term
+        # Optional approximate candidate generator, probed over ann_tables tables
+        self.ann = None
+        self.ann_tables = config.ANN_TABLES
+
+    @classmethod
+    def from_frame(cls, data):
+        # scikit-learn takes about a second to import; snapshots loaded by
+        # load() never need it
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        vectorizer = TfidfVectorizer(
+            stop_words="english",
+            token_pattern=r"(?u)\b[^\W\d_]{2,}\b",
+            sublinear_tf=True,
+            dtype=np.float32,
+        )
+        matrix = vectorizer.fit_transform(product_documents(data))
+        return cls(vectorizer, matrix)
+
+    def updated(self, remap, frame):
+        """A new model keeping the rows `remap` maps to (in order) and appending
+        `frame` transformed with the current fit.
+
+        Terms the fit has never seen are ignored for the appended rows until
+        the model is refitted; `stale_rows` counts how many rows that affects.
+        """
+        kept = np.flatnonzero(remap >= 0)
+        appended = self.vectorizer.transform(product_documents(frame)) if len(frame) else None
+        matrix = self.matrix[kept]
+        if appended is not None:
+            matrix = sp.vstack([matrix, appended], format="csr")
+        model = type(self)(self.vectorizer, matrix, self.stale_rows + len(frame))
+        if self.ann is not None:
+            model.ann = self.ann.updated(remap, appended)
+        return model
+
+    def save(self, directory):
+        """Write both CSR matrices as .npy arrays that load() memory-maps."""
+        os.makedirs(directory, exist_ok=True)
+        for name, matrix in (("matrix", self.matrix), ("by_term", self._by_term)):
+            np.save(os.path.join(directory, f"{name}.shape.npy"), np.asarray(matrix.shape, dtype=np.int64))
+            for part in ("data", "indices", "indptr"):
+                np.save(os.path.join(directory, f"{name}.{part}.npy"), getattr(matrix, part))
+
+    @classmethod
+    def load(cls, directory):
+        """A query-only model over memory-mapped matrices written by save().
+
+        There is no fitted vectorizer, so it cannot be updated or fingerprinted.
+        """
+        def csr(name):
+            parts = [
+                np.load(os.path.join(directory, f"{name}.{part}.npy"), mmap_mode="r")
+                for part in ("data", "indices", "indptr")
+            ]
+            shape = tuple(np.load(os.path.join(directory, f"{name}.shape.npy")))
+            return sp.csr_matrix(tuple(parts), shape=shape, copy=False)
+
+        return cls(None, csr("matrix"), by_term=csr("by_term"))
+
+    @property
+    def n_rows(self):
+        return self.matrix.shape[0]
+
+    @property
+    def fingerprint(self):
+        """Identifies the fitted matrix so persisted indexes can be matched to it."""
+        digest = hashlib.sha1()
+        digest.update(" ".join(self.vectorizer.get_feature_names_out()).encode())
+        for array in (self.matrix.indptr, self.matrix.indices, self.matrix.data):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def scores(self, row_id):
+        """Sparse cosine scores of every product sharing a term with `row_id`."""
+        lo, hi = self.matrix.indptr[row_id], self.matrix.indptr[row_id + 1]
+        if lo == hi:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if self.ann is not None and self.ann_tables > 0:
+            row = self.matrix[row_id]
+            ids = self.ann.candidates(row, self.ann_tables)
+            values = np.asarray((self.matrix[ids] @ row.T).todense()).ravel()
+            return ids, values
+        # Walk the postings of the row's terms on the raw CSR arrays; scipy's
+        # per-call overhead dominates a lookup this small
+        by_term = self._by_term
+        terms, weights = self.matrix.indices[lo:hi], self.matrix.data[lo:hi]
+        starts, stops = by_term.indptr[terms], by_term.indptr[terms + 1]
+        ids = np.concatenate([by_term.indices[a:b] for a, b in zip(starts, stops)])
+        values = np.concatenate([by_term.data[a:b] * w for a, b, w in zip(starts, stops, weights)])
+        ids, inverse = np.unique(ids, return_inverse=True)
+        return ids.astype(np.int64), np.bincount(inverse, weights=values, minlength=len(ids)).astype(np.float32)
+
+    def top_k(self, row_id, k=5, allowed=None):
+        """Ids and scores of the `k` products closest to `row_id`.
+
+        `allowed` is an optional boolean mask over all rows restricting which
+        products may be returned.
+        """
+        ids, values = self.scores(row_id)
+        keep = ids != row_id
+        if allowed is not None:
+            keep &= allowed[ids]
+        ids, values = ids[keep], values[keep]
+        if len(ids) > k:
+            top = np.argpartition(values, -k)[-k:]
+            ids, values = ids[top], values[top]
+        order = np.argsort(-values, kind="stable")
+        return ids[order], values[order]
@@ -0,0 +1,176 @@
+"""Page CSS for the app's light and dark themes.
+
+Kept out of app.py, which Streamlit re-executes on every rerun: the memo
+below lives as long as the process, so each theme is formatted once.
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_css(theme):
+    return f"""
+    <style>
+    /* Global Theme Variables */
+    :root {{
+        --bg-primary: {('#1a1a2e' if theme == 'dark' else '#ffffff')};
+        --bg-secondary: {('#16213e' if theme == 'dark' else '#f8f9fa')};
+        --text-primary: {('#e6e6e6' if theme == 'dark' else '#1a1a2e')};
+        --accent-color: #4CAF50;
+        --accent-hover: #45a049;
+    }}
+
+    /* Global Styles */
+    [data-testid="stAppViewContainer"] {{
+        background: linear-gradient(135deg, var(--bg-primary), var(--bg-secondary));
+        color: var(--text-primary);
+        transition: all 0.3s ease;
+    }}
+    
+    /* Modern Cards */
+    .modern-card {{
+        background: {('rgba(255, 255, 255, 0.05)' if theme == 'dark' else 'rgba(255, 255, 255, 0.9)')};
+        backdrop-filter: blur(10px);
+        border-radius: 20px;
+        padding: 2rem;
+        margin: 1rem 0;
+        border: 1px solid {('rgba(255, 255, 255, 0.1)' if theme == 'dark' else 'rgba(0, 0, 0, 0.1)')};
+        box-shadow: 0 8px 32px {('rgba(0, 0, 0, 0.1)' if theme == 'dark' else 'rgba(0, 0, 0, 0.05)')};
+        transition: transform 0.3s ease, box-shadow 0.3s ease;
+    }}
+    
+    .modern-card:hover {{
+        transform: translateY(-5px);
+        box-shadow: 0 12px 40px {('rgba(0, 0, 0, 0.2)' if theme == 'dark' else 'rgba(0, 0, 0, 0.1)')};
+    }}
+    
+    /* Buttons */
+    .stButton button {{
+        background: linear-gradient(45deg, var(--accent-color), var(--accent-hover));
+        color: white;
+        border-radius: 30px;
+        padding: 0.5rem 2rem;
+        border: none;
+        box-shadow: 0 4px 15px rgba(76, 175, 80, 0.3);
+        transition: all 0.3s ease;
+    }}
+    
+    .stButton button:hover {{
+        transform: translateY(-2px);
+        box-shadow: 0 6px 20px rgba(76, 175, 80, 0.4);
+    }}
+    
+    /* Search Box */
+    .stTextInput input {{
+        background: {('rgba(255, 255, 255, 0.05)' if theme == 'dark' else 'rgba(0, 0, 0, 0.05)')};
+        border: 2px solid rgba(76, 175, 80, 0.3);
+        border-radius: 15px;
+        color: var(--text-primary);
+        padding: 1rem;
+        transition: all 0.3s ease;
+    }}
+    
+    .stTextInput input:focus {{
+        border-color: var(--accent-color);
+        box-shadow: 0 0 15px rgba(76, 175, 80, 0.2);
+        transform: translateY(-2px);
+    }}
+    
+    /* Select Box */
+    .stSelectbox select {{
+        background: {('rgba(255, 255, 255, 0.05)' if theme == 'dark' else 'rgba(0, 0, 0, 0.05)')};
+        border-radius: 15px;
+        border: 2px solid rgba(76, 175, 80, 0.3);
+        color: var(--text-primary);
+        transition: all 0.3s ease;
+    }}
+    
+    /* Navigation */
+    .nav-link {{
+        background: {('rgba(255, 255, 255, 0.05)' if theme == 'dark' else 'rgba(0, 0, 0, 0.05)')} !important;
+        border-radius: 10px !important;
+        margin: 5px !important;
+        transition: all 0.3s ease !important;
+    }}
+    
+    .nav-link:hover {{
+        background: rgba(76, 175, 80, 0.1) !important;
+        transform: translateY(-2px) !important;
+    }}
+    
+    .nav-link.active {{
+        background: linear-gradient(45deg, var(--accent-color), var(--accent-hover)) !important;
+        color: white !important;
+    }}
+
+    /* Loading Animation */
+    @keyframes skeleton-loading {{
+        0% {{ background-position: 100% 50%; }}
+        100% {{ background-position: 0 50%; }}
+    }}
+
+    .skeleton {{
+        background: linear-gradient(90deg, 
+            {('rgba(255, 255, 255, 0.05)' if theme == 'dark' else 'rgba(0, 0, 0, 0.05)')} 25%, 
+            {('rgba(255, 255, 255, 0.1)' if theme == 'dark' else 'rgba(0, 0, 0, 0.1)')} 37%, 
+            {('rgba(255, 255, 255, 0.05)' if theme == 'dark' else 'rgba(0, 0, 0, 0.05)')} 63%);
+        background-size: 400% 100%;
+        animation: skeleton-loading 1.4s ease infinite;
+    }}
+
+    /* Toast Notifications */
+    .toast {{
+        position: fixed;
+        bottom: 20px;
+        right: 20px;
+        padding: 1rem 2rem;
+        border-radius: 10px;
+        background: var(--accent-color);
+        color: white;
+        box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2);
+        animation: slideIn 0.3s ease forwards;
+    }}
+
+    @keyframes slideIn {{
+        from {{ transform: translateX(100%); }}
+        to {{ transform: translateX(0); }}
+    }}
+
+    /* Theme Toggle */
+    .theme-toggle {{
+        position: fixed;
+        top: 20px;
+        right: 20px;
+        z-index: 1000;
+    }}
+
+    /* Responsive Design */
+    @media (max-width: 768px) {{
+        .modern-card {{
+            padding: 1rem;
+        }}
+        
+        .stButton button {{
+            width: 100%;
+        }}
+    }}
+
+    /* Header Styles */
+    .header {{
+        background: linear-gradient(45deg, var(--accent-color), var(--accent-hover));
+        color: white;
+        padding: 1rem 2rem;
+        border-radius: 15px;
+        margin-bottom: 2rem;
+    }}
+
+    .header h1 {{
+        margin: 0;
+        font-size: 2rem;
+    }}
+
+    .header p {{
+        margin: 0.5rem 0 0 0;
+        opacity: 0.9;
+    }}
+    </style>
+    """
@@ -0,0 +1,30 @@
+import json
+from http import HTTPStatus
+
+import pytest
+
+from api import APIServer
+from catalogue import CatalogueStore
+
+
+@pytest.fixture(scope="module")
+def server():
+    return APIServer(CatalogueStore())
+
+
+@pytest.mark.parametrize("params", [["q", "chips"], {"q": 5}, {"category": [["x"]]}])
+def test_batch_rejects_malformed_params(server, params):
+    body = json.dumps({"requests": [{"path": "/stats", "params": params}, {"path": "/health"}]}).encode()
+    status, payload = server.respond("POST", "/batch", body)
+    assert status == HTTPStatus.OK
+    assert [response["status"] for response in payload["responses"]] == [HTTPStatus.BAD_REQUEST, HTTPStatus.OK]
+
+
+def test_unexpected_error_is_a_500(server, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(server, "_respond", fail)
+    status, payload = server.respond("GET", "/health", b"")
+    assert status == HTTPStatus.INTERNAL_SERVER_ERROR
+    assert payload == {"error": "internal error"}
@@ -0,0 +1,109 @@
+import gc
+import json
+import os
+import shutil
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+from catalogue import CatalogueStore, _match
+
+QUERIES = ["palm oil", "chocolate", "zebrafruit", "plus", "chips"]
+
+
+@pytest.fixture
+def csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "catalogue.csv"
+    pd.read_csv(config.DATA_FILE).to_csv(path, index=False)
+    return str(path)
+
+
+def edited(path):
+    """The catalogue with rows deleted, edited, added and shuffled."""
+    raw = pd.read_csv(path)
+    rng = np.random.default_rng(1)
+    new = raw.drop(index=rng.choice(len(raw), 40, replace=False))
+    rows = rng.choice(new.index, 30, replace=False)
+    new.loc[rows, "Ingredient Details"] = new.loc[rows, "Ingredient Details"].astype(str) + ", Palm Oil, Zebrafruit"
+    extra = raw.sample(25, random_state=3)
+    extra["Product Name"] = extra["Product Name"].astype(str) + " Plus"
+    return pd.concat([new, extra]).sample(frac=1, random_state=5)
+
+
+def test_delta_reload_matches_full_build(csv):
+    store = CatalogueStore(csv)
+    store.snapshot.similarity_model  # fitted, so the reload updates it in place
+    time.sleep(0.01)
+    edited(csv).to_csv(csv, index=False)
+    assert store.refresh()
+    assert store.last_reload["removed"] == 40 and store.last_reload["added"] == 25
+
+    delta, full = store.snapshot, CatalogueStore(csv).snapshot
+    # Row ids differ between the two; rows are compared by key and content
+    order = _match(
+        full.keys + "|" + full.hashes.astype(str).astype(object),
+        delta.keys + "|" + delta.hashes.astype(str).astype(object),
+    )
+    assert (order >= 0).all()
+    pd.testing.assert_frame_equal(delta.data, full.data.iloc[order].reset_index(drop=True))
+    np.testing.assert_allclose(delta.harmful_scorer.scores, full.harmful_scorer.scores[order])
+    assert delta.similarity_model.n_rows == len(delta.data)
+    # Texts only the old version had are forgotten
+    assert set(store.parser._parsed) == set(delta.data["ingredient_details"])
+
+    def keys(snapshot, ids):
+        return sorted(snapshot.keys[ids])
+
+    for query in QUERIES:
+        assert keys(delta, delta.search_index.search(query)) == keys(full, full.search_index.search(query)), query
+        assert keys(delta, delta.filter_pipeline.rows("All", "All", "", query)) == keys(
+            full, full.filter_pipeline.rows("All", "All", "", query)
+        ), query
+    for by in ("category", "brand", "harmful_status"):
+        a, b = delta.analytics_cube.totals(by), full.analytics_cube.totals(by)
+        pd.testing.assert_series_equal(a[a > 0].sort_index(), b[b > 0].sort_index(), check_names=False)
+
+
+def test_rules_edit_rescores_a_new_snapshot(csv, tmp_path, monkeypatch):
+    rules_file = tmp_path / "rules.json"
+    shutil.copy(config.RULES_FILE, rules_file)
+    monkeypatch.setattr(config, "RULES_FILE", str(rules_file))
+    store = CatalogueStore(csv)
+    before = store.snapshot
+    scores = before.harmful_scorer.scores.copy()
+    product = next(
+        i for i in range(len(before.data))
+        if any("palm oil" in name for name, _, _ in before.harmful_scorer.contributions(i))
+    )
+
+    rules = json.loads(rules_file.read_text(encoding="utf-8"))
+    assert rules["palm oil"]["weight"] == 1.5
+    rules["palm oil"]["weight"] = 4.0
+    rules_file.write_text(json.dumps(rules), encoding="utf-8")
+    stat = os.stat(rules_file)
+    os.utime(rules_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert store.refresh()
+
+    after = store.snapshot
+    assert after is not before and after.id != before.id
+    assert after.data is before.data and after.search_index is before.search_index
+    assert after.harmful_scorer.scores[product] > scores[product]
+    assert any(weight == 4.0 for _, weight, _ in after.harmful_scorer.contributions(product))
+    # Readers of the old snapshot keep its scores
+    np.testing.assert_array_equal(before.harmful_scorer.scores, scores)
+    assert not store.refresh()
+
+
+def test_dropped_store_stops_watching(csv):
+    store = CatalogueStore(csv)
+    store.watch(0.05)
+    watcher, source = store._watcher, weakref.ref(store)
+    del store
+    gc.collect()
+    watcher.join(1)
+    assert source() is None and not watcher.is_alive()
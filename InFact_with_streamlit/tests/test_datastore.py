@@ -0,0 +1,39 @@
+import os
+
+import pandas as pd
+
+import config
+from datastore import cache_path, file_hash, ingest, load_catalogue, read_cache, read_catalogue
+
+
+def test_ingest_matches_whole_file(tmp_path):
+    rows = pd.read_csv(config.DATA_FILE, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    rows = rows.loc[:, ~rows.columns.str.startswith("Unnamed")]
+    n = len(rows)
+    # An extra column filled only in the first chunk, one empty in the first
+    # chunk but not later, a chunk of numbers-only brands and a headerless
+    # column with data outside the first chunk
+    rows["Notes"] = [f"note {i}" if i <= 10 else "" for i in range(n)]
+    rows["Barcode"] = [str(10**9 + i) if i >= 1500 else "" for i in range(n)]
+    rows.loc[1000:1999, "Brand"] = [str(i) for i in range(1000)]
+    rows[""] = ["x" if i == 2500 else "" for i in range(n)]
+    path = tmp_path / "catalogue.csv"
+    rows.to_csv(path, index=False, encoding="utf-8-sig")
+
+    target = str(tmp_path / "catalogue.arrow")
+    assert ingest(str(path), target, chunk_rows=1000) == n
+    pd.testing.assert_frame_equal(read_cache(target), read_catalogue(str(path)))
+
+
+def test_new_cache_replaces_old_ones(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path))
+    other_source = tmp_path / "other.csv"
+    kept = [os.path.basename(cache_path(str(other_source), "ab" * 8)), "notes.arrow"]
+    # Earlier contents of this CSV, a cache named before names carried the CSV
+    # path, another CSV's cache and a file that is not a cache
+    stale = [os.path.basename(cache_path(config.DATA_FILE, "fe" * 8)), "catalogue-v1-0123456789abcdef.arrow"]
+    for name in stale + kept:
+        (tmp_path / name).write_bytes(b"")
+    load_catalogue(config.DATA_FILE)
+    current = os.path.basename(cache_path(config.DATA_FILE, file_hash(config.DATA_FILE)))
+    assert sorted(os.listdir(tmp_path)) == sorted([current] + kept)
@@ -0,0 +1,39 @@
+import pandas as pd
+
+from fuzzy import TrigramIndex, bounded_distance, max_edits
+from search_index import SearchIndex
+
+
+def test_transposition_is_one_edit():
+    assert bounded_distance("choclate", "chocolate", 2) == 1
+    assert bounded_distance("cohcolate", "chocolate", 2) == 1
+    assert bounded_distance("ba", "ab", 1) == 1
+    assert bounded_distance("chocolate", "chocolate", 0) == 0
+
+
+def test_distance_over_the_limit_stops_at_limit_plus_one():
+    # Far apart in length, or in content: the exact distance is never computed
+    assert bounded_distance("tea", "chocolate", 2) == 3
+    assert bounded_distance("abcdefgh", "stuvwxyz", 1) == 2
+    assert bounded_distance("abcdefgh", "stuvwxyz", 8) == 8
+
+
+def test_similar_tokens_within_the_term_budget():
+    assert max_edits("tea") == 0 and max_edits("brocoli") == 1 and max_edits("chocolates") == 2
+    index = TrigramIndex.from_tokens(["broccoli", "brownie", "carrot", "brioche"])
+    assert index.similar("brocoli") == [("broccoli", 1)]
+    assert index.similar("tea") == []
+
+
+def test_fuzzy_search_corrects_misspelt_terms():
+    data = pd.DataFrame({
+        "product_name": ["Broccoli Florets", "Brownie Bites", "Carrot Sticks"],
+        "brand": ["Green", "Bake", "Green"],
+        "ingredient_details": ["Broccoli", "Cocoa", "Carrot"],
+    })
+    index = SearchIndex.from_frame(data)
+    assert index.search("brocoli").tolist() == []
+    ids, corrections = index.fuzzy_search("brocoli")
+    assert ids.tolist() == [0] and corrections == {"brocoli": "broccoli"}
+    # Nothing to correct
+    assert index.fuzzy_search("broccoli")[1] == {}
@@ -0,0 +1,46 @@
+from ingredients import IngredientTable, parse_ingredients
+
+
+def test_nested_ingredients_keep_their_lowest_depth():
+    text = "Potato Bites (Potatoes, Sunflower Oil, Seasoning Blend (Salt, Onion Powder, Paprika Extract)), Salt"
+    assert parse_ingredients(text) == [
+        ("potato bites", 0),
+        ("potatoes", 1),
+        ("sunflower oil", 1),
+        ("seasoning blend", 1),
+        ("salt", 0),
+        ("onion powder", 2),
+        ("paprika extract", 2),
+    ]
+
+
+def test_square_brackets_nest_and_empty_ones_are_dropped():
+    assert parse_ingredients("Sugar [Cane Sugar (Organic)], [], Cocoa") == [
+        ("sugar", 0), ("cane sugar", 1), ("organic", 2), ("cocoa", 0),
+    ]
+    # Unbalanced closing brackets do not go below the top level
+    assert parse_ingredients("Milk)), Salt") == [("milk", 0), ("salt", 0)]
+
+
+def test_names_are_canonicalized():
+    text = "Cocoa Butter 12.5%, Milk 3 %*, NatureN/AIdentical Flavour, Less than 2% of: Dextrin, Emulsifier: Lecithin, and Salt."
+    assert parse_ingredients(text) == [
+        ("cocoa butter", 0),
+        ("milk", 0),
+        ("nature-identical flavour", 0),
+        ("dextrin", 0),
+        ("lecithin", 0),
+        ("salt", 0),
+    ]
+
+
+def test_roman_numerals_and_empty_values_are_dropped():
+    assert parse_ingredients("Vitamins (i, ii, iv, Vitamin C), N/A, x, nan") == [("vitamins", 0), ("vitamin c", 1)]
+
+
+def test_matching_ids_matches_whole_words():
+    table = IngredientTable.from_texts(["Refined Palm Oil, Sugar", "Palmolein", "Palm Oil", "Palm Kernel Oil"])
+    assert [table.vocabulary[i] for i in table.matching_ids("palm oil")] == ["refined palm oil", "palm oil"]
+    assert table.products_with("Palm Oil").tolist() == [0, 2]
+    assert table.products_with("palm").tolist() == [0, 2, 3]
+    assert table.matching_ids("") == []
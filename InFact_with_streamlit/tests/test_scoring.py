@@ -0,0 +1,52 @@
+import pytest
+
+from ingredients import IngredientTable
+from scoring import HarmfulScorer, load_rules
+
+TEXTS = [
+    "Water, Alcohol, Sugar",
+    "Sugar Alcohol (Maltitol), Cocoa",
+    "Refined Palm Oil, Hydrogenated Palm Oil, Salt",
+    "Palmolein, Maltodextrin, Corn Syrup",
+]
+
+
+def scorer(rules=None):
+    return HarmfulScorer(IngredientTable.from_texts(TEXTS), rules)
+
+
+def test_exact_rule_matches_only_the_identical_name():
+    rules = load_rules()
+    assert rules["alcohol"].get("exact")
+    harmful = scorer(rules)
+    assert [name for name, _, _ in harmful.contributions(0)] == ["alcohol"]
+    # "sugar alcohol" contains the word, but the rule is exact
+    assert "sugar alcohol" not in [name for name, _, _ in harmful.contributions(1)]
+    rules["alcohol"] = dict(rules["alcohol"], exact=False)
+    assert "sugar alcohol" in [name for name, _, _ in scorer(rules).contributions(1)]
+
+
+def test_most_severe_rule_wins():
+    rules = {
+        "palm oil": {"weight": 1.5, "reason": "High in saturated fat"},
+        "hydrogenated": {"weight": 2.5, "reason": "May contain trans fat"},
+        "oil": {"weight": 0.5, "reason": "Oil"},
+    }
+    # In either order, the heaviest matching rule sets the weight and reason
+    for ordered in (rules, dict(reversed(rules.items()))):
+        contributions = {name: (weight, reason) for name, weight, reason in scorer(ordered).contributions(2)}
+        assert contributions == {
+            "hydrogenated palm oil": (2.5, "May contain trans fat"),
+            "refined palm oil": (1.5, "High in saturated fat"),
+        }
+    assert scorer(rules).scores[2] == pytest.approx(4.0)
+
+
+def test_contributions_largest_first():
+    rules = {
+        "maltodextrin": {"weight": 1.0, "reason": "a"},
+        "palmolein": {"weight": 1.5, "reason": "b"},
+        "corn syrup": {"weight": 3.0, "reason": "c"},
+    }
+    assert scorer(rules).contributions(3) == [("corn syrup", 3.0, "c"), ("palmolein", 1.5, "b"), ("maltodextrin", 1.0, "a")]
+    assert scorer(rules).contributions(0) == []
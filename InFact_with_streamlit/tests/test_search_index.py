@@ -0,0 +1,19 @@
+import pandas as pd
+
+from search_index import SearchIndex, tokenize
+
+
+def test_tokenize_joins_ampersands_and_drops_apostrophes():
+    assert tokenize("M&M's Peanut, Lay’s Classic, Ben & Jerry's") == ["m&ms", "peanut", "lays", "classic", "ben", "jerrys"]
+
+
+def test_single_letters_match_only_themselves():
+    data = pd.DataFrame({
+        "product_name": ["M&M's Peanut", "Milk", "Probar Base Layer", "Lay's Classic", "Vitamin D Milk"],
+        "brand": ["Mars", "Dairy", "Probar", "Lays", "Dairy"],
+        "ingredient_details": ["Sugar", "Milk", "Oats", "Potatoes", "Milk, Vitamin D"],
+    })
+    index = SearchIndex.from_frame(data)
+    assert index.search("m&m").tolist() == [0]
+    assert index.search("Lay's").tolist() == [3]
+    assert index.search("milk d").tolist() == [4]